@@ -3,316 +3,291 @@ Fridge to Recipe - AI-Powered Recipe Suggestions
 Upload a photo of your ingredients and get personalized recipe suggestions!
 """
 
+from __future__ import annotations
+
 import streamlit as st
-import anthropic
-import openai
-import base64
+import httpx
+import pybase64
+import hashlib
+import io
 import time
-import json
+import logging
+import orjson
+import random
+import re
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
-from supabase import create_client, Client
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+from PIL import Image, ImageOps
 import os
 
+# The anthropic, openai and supabase SDKs take about a second each to import. They are imported in the
+# functions that use them, so a cold start draws the page first and skips the SDKs without an API key.
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+logger = logging.getLogger(__name__)
 
+
+@st.cache_resource(show_spinner=False)
 def get_secret(key: str, default=None):
-    """Get secret from Streamlit secrets (cloud) or environment variables (local)."""
+    """Get secret from Streamlit secrets (cloud) or environment variables (local).
+
+    Cached for the lifetime of the process, so restart the app after changing a secret.
+    """
     # First try Streamlit secrets (for Streamlit Cloud)
     try:
-        return st.secrets[key]
-    except (KeyError, FileNotFoundError):
+        if key in st.secrets:
+            return st.secrets[key]
+    except FileNotFoundError:
         pass
     
     # Fall back to environment variables (for local development)
     return os.getenv(key, default)
 
 
+# Emoji mappings by category, keyed on lowercase names in every language
+INGREDIENT_EMOJIS = {
+    # Proteins
+    'chicken': '🍗', 'poulet': '🍗', 'kurczak': '🍗',
+    'beef': '🥩', 'boeuf': '🥩', 'bœuf': '🥩', 'wołowina': '🥩',
+    'pork': '🥓', 'porc': '🥓', 'wieprzowina': '🥓',
+    'fish': '🐟', 'poisson': '🐟', 'ryba': '🐟',
+    'salmon': '🍣', 'saumon': '🍣', 'łosoś': '🍣',
+    'tuna': '🐟', 'thon': '🐟', 'tuńczyk': '🐟',
+    'shrimp': '🦐', 'crevette': '🦐', 'krewetki': '🦐',
+    'egg': '🥚', 'oeuf': '🥚', 'œuf': '🥚', 'jajko': '🥚', 'eggs': '🥚', 'oeufs': '🥚', 'jajka': '🥚',
+    'bacon': '🥓', 'lardons': '🥓', 'boczek': '🥓',
+    'ham': '🍖', 'jambon': '🍖', 'szynka': '🍖',
+    'sausage': '🌭', 'saucisse': '🌭', 'kiełbasa': '🌭',
+    'meat': '🍖', 'viande': '🍖', 'mięso': '🍖',
+    'turkey': '🦃', 'dinde': '🦃', 'indyk': '🦃',
+    'duck': '🦆', 'canard': '🦆', 'kaczka': '🦆',
+    
+    # Vegetables
+    'tomato': '🍅', 'tomate': '🍅', 'pomidor': '🍅',
+    'carrot': '🥕', 'carotte': '🥕', 'marchew': '🥕',
+    'potato': '🥔', 'pomme de terre': '🥔', 'ziemniak': '🥔', 'patate': '🥔',
+    'onion': '🧅', 'oignon': '🧅', 'cebula': '🧅',
+    'garlic': '🧄', 'ail': '🧄', 'czosnek': '🧄',
+    'pepper': '🫑', 'poivron': '🫑', 'papryka': '🫑',
+    'broccoli': '🥦', 'brocoli': '🥦', 'brokuły': '🥦',
+    'lettuce': '🥬', 'laitue': '🥬', 'salade': '🥬', 'sałata': '🥬',
+    'spinach': '🥬', 'épinard': '🥬', 'szpinak': '🥬',
+    'cucumber': '🥒', 'concombre': '🥒', 'ogórek': '🥒',
+    'corn': '🌽', 'maïs': '🌽', 'kukurydza': '🌽',
+    'mushroom': '🍄', 'champignon': '🍄', 'grzyb': '🍄',
+    'eggplant': '🍆', 'aubergine': '🍆', 'bakłażan': '🍆',
+    'zucchini': '🥒', 'courgette': '🥒', 'cukinia': '🥒',
+    'pumpkin': '🎃', 'citrouille': '🎃', 'dynia': '🎃',
+    'cabbage': '🥬', 'chou': '🥬', 'kapusta': '🥬',
+    'celery': '🥬', 'céleri': '🥬', 'seler': '🥬',
+    'asparagus': '🥦', 'asperge': '🥦', 'szparagi': '🥦',
+    'peas': '🟢', 'petit pois': '🟢', 'groszek': '🟢',
+    'beans': '🫘', 'haricot': '🫘', 'fasola': '🫘',
+    'radish': '🔴', 'radis': '🔴', 'rzodkiewka': '🔴',
+    
+    # Fruits
+    'apple': '🍎', 'pomme': '🍎', 'jabłko': '🍎',
+    'banana': '🍌', 'banane': '🍌', 'banan': '🍌',
+    'orange': '🍊', 'pomarańcza': '🍊',
+    'lemon': '🍋', 'citron': '🍋', 'cytryna': '🍋',
+    'lime': '🍋', 'citron vert': '🍋', 'limonka': '🍋',
+    'strawberry': '🍓', 'fraise': '🍓', 'truskawka': '🍓',
+    'grape': '🍇', 'raisin': '🍇', 'winogrono': '🍇',
+    'watermelon': '🍉', 'pastèque': '🍉', 'arbuz': '🍉',
+    'peach': '🍑', 'pêche': '🍑', 'brzoskwinia': '🍑',
+    'pear': '🍐', 'poire': '🍐', 'gruszka': '🍐',
+    'cherry': '🍒', 'cerise': '🍒', 'wiśnia': '🍒',
+    'pineapple': '🍍', 'ananas': '🍍',
+    'mango': '🥭', 'mangue': '🥭',
+    'coconut': '🥥', 'noix de coco': '🥥', 'kokos': '🥥',
+    'kiwi': '🥝',
+    'avocado': '🥑', 'avocat': '🥑', 'awokado': '🥑',
+    'melon': '🍈',
+    'blueberry': '🫐', 'myrtille': '🫐', 'borówka': '🫐',
+    
+    # Dairy
+    'milk': '🥛', 'lait': '🥛', 'mleko': '🥛',
+    'cheese': '🧀', 'fromage': '🧀', 'ser': '🧀',
+    'butter': '🧈', 'beurre': '🧈', 'masło': '🧈',
+    'yogurt': '🥛', 'yaourt': '🥛', 'jogurt': '🥛',
+    'cream': '🥛', 'crème': '🥛', 'śmietana': '🥛',
+    
+    # Grains & Carbs
+    'bread': '🍞', 'pain': '🍞', 'chleb': '🍞',
+    'rice': '🍚', 'riz': '🍚', 'ryż': '🍚',
+    'pasta': '🍝', 'pâtes': '🍝', 'makaron': '🍝',
+    'noodle': '🍜', 'nouille': '🍜',
+    'flour': '🌾', 'farine': '🌾', 'mąka': '🌾',
+    'cereal': '🥣', 'céréale': '🥣', 'płatki': '🥣',
+    'oat': '🌾', 'avoine': '🌾', 'owies': '🌾',
+    'croissant': '🥐',
+    'bagel': '🥯',
+    'pretzel': '🥨',
+    'pancake': '🥞', 'crêpe': '🥞', 'naleśnik': '🥞',
+    'waffle': '🧇', 'gaufre': '🧇',
+    'tortilla': '🫓', 'wrap': '🫓',
+    'pizza': '🍕',
+    
+    # Condiments & Sauces
+    'salt': '🧂', 'sel': '🧂', 'sól': '🧂',
+    'honey': '🍯', 'miel': '🍯', 'miód': '🍯',
+    'oil': '🫒', 'huile': '🫒', 'olej': '🫒',
+    'olive': '🫒',
+    'vinegar': '🍶', 'vinaigre': '🍶', 'ocet': '🍶',
+    'sauce': '🥫', 'sos': '🥫',
+    'ketchup': '🍅',
+    'mustard': '🟡', 'moutarde': '🟡', 'musztarda': '🟡',
+    'mayonnaise': '🥚', 'mayo': '🥚', 'majonez': '🥚',
+    'soy': '🥢', 'soja': '🥢',
+    
+    # Drinks
+    'water': '💧', 'eau': '💧', 'woda': '💧',
+    'juice': '🧃', 'jus': '🧃', 'sok': '🧃',
+    'coffee': '☕', 'café': '☕', 'kawa': '☕',
+    'tea': '🍵', 'thé': '🍵', 'herbata': '🍵',
+    'wine': '🍷', 'vin': '🍷', 'wino': '🍷',
+    'beer': '🍺', 'bière': '🍺', 'piwo': '🍺',
+    
+    # Nuts & Seeds
+    'nut': '🥜', 'noix': '🥜', 'orzech': '🥜',
+    'peanut': '🥜', 'cacahuète': '🥜', 'orzeszek': '🥜',
+    'almond': '🌰', 'amande': '🌰', 'migdał': '🌰',
+    'chestnut': '🌰', 'châtaigne': '🌰', 'kasztan': '🌰',
+    
+    # Sweets
+    'chocolate': '🍫', 'chocolat': '🍫', 'czekolada': '🍫',
+    'candy': '🍬', 'bonbon': '🍬', 'cukierek': '🍬',
+    'cookie': '🍪', 'biscuit': '🍪', 'ciastko': '🍪',
+    'cake': '🍰', 'gâteau': '🍰', 'ciasto': '🍰',
+    'ice cream': '🍦', 'glace': '🍦', 'lody': '🍦',
+    'sugar': '🍬', 'sucre': '🍬', 'cukier': '🍬',
+    
+    # Herbs & Spices
+    'herb': '🌿', 'herbe': '🌿', 'zioła': '🌿',
+    'basil': '🌿', 'basilic': '🌿', 'bazylia': '🌿',
+    'parsley': '🌿', 'persil': '🌿', 'pietruszka': '🌿',
+    'mint': '🌿', 'menthe': '🌿', 'mięta': '🌿',
+    'thyme': '🌿', 'thym': '🌿', 'tymianek': '🌿',
+    'rosemary': '🌿', 'romarin': '🌿', 'rozmaryn': '🌿',
+    'cinnamon': '🟤', 'cannelle': '🟤', 'cynamon': '🟤',
+    'ginger': '🫚', 'gingembre': '🫚', 'imbir': '🫚',
+    'chili': '🌶️', 'piment': '🌶️',
+    'pepper': '🌶️', 'poivre': '🌶️', 'pieprz': '🌶️',
+    
+    # Seafood
+    'crab': '🦀', 'crabe': '🦀', 'krab': '🦀',
+    'lobster': '🦞', 'homard': '🦞', 'homar': '🦞',
+    'oyster': '🦪', 'huître': '🦪', 'ostryga': '🦪',
+    'squid': '🦑', 'calamar': '🦑', 'kałamarnica': '🦑',
+    'octopus': '🐙', 'poulpe': '🐙', 'ośmiornica': '🐙',
+}
+
+
+MULTI_WORD_INGREDIENTS = [(key, emoji) for key, emoji in INGREDIENT_EMOJIS.items() if ' ' in key]
+INGREDIENT_WORD_RE = re.compile(r"\w+")
+
+
+# Memoized for the current run: the editor, the recipes and the download repeat the same names.
+# Call cache_clear() if INGREDIENT_EMOJIS is ever changed at runtime.
+@lru_cache(maxsize=2048)
 def get_ingredient_emoji(ingredient: str) -> str:
     """Get an emoji for an ingredient."""
     ingredient_lower = ingredient.lower()
     
-    # Emoji mappings by category
-    emoji_map = {
-        # Proteins
-        'chicken': '🍗', 'poulet': '🍗', 'kurczak': '🍗',
-        'beef': '🥩', 'boeuf': '🥩', 'bœuf': '🥩', 'wołowina': '🥩',
-        'pork': '🥓', 'porc': '🥓', 'wieprzowina': '🥓',
-        'fish': '🐟', 'poisson': '🐟', 'ryba': '🐟',
-        'salmon': '🍣', 'saumon': '🍣', 'łosoś': '🍣',
-        'tuna': '🐟', 'thon': '🐟', 'tuńczyk': '🐟',
-        'shrimp': '🦐', 'crevette': '🦐', 'krewetki': '🦐',
-        'egg': '🥚', 'oeuf': '🥚', 'œuf': '🥚', 'jajko': '🥚', 'eggs': '🥚', 'oeufs': '🥚', 'jajka': '🥚',
-        'bacon': '🥓', 'lardons': '🥓', 'boczek': '🥓',
-        'ham': '🍖', 'jambon': '🍖', 'szynka': '🍖',
-        'sausage': '🌭', 'saucisse': '🌭', 'kiełbasa': '🌭',
-        'meat': '🍖', 'viande': '🍖', 'mięso': '🍖',
-        'turkey': '🦃', 'dinde': '🦃', 'indyk': '🦃',
-        'duck': '🦆', 'canard': '🦆', 'kaczka': '🦆',
-        
-        # Vegetables
-        'tomato': '🍅', 'tomate': '🍅', 'pomidor': '🍅',
-        'carrot': '🥕', 'carotte': '🥕', 'marchew': '🥕',
-        'potato': '🥔', 'pomme de terre': '🥔', 'ziemniak': '🥔', 'patate': '🥔',
-        'onion': '🧅', 'oignon': '🧅', 'cebula': '🧅',
-        'garlic': '🧄', 'ail': '🧄', 'czosnek': '🧄',
-        'pepper': '🫑', 'poivron': '🫑', 'papryka': '🫑',
-        'broccoli': '🥦', 'brocoli': '🥦', 'brokuły': '🥦',
-        'lettuce': '🥬', 'laitue': '🥬', 'salade': '🥬', 'sałata': '🥬',
-        'spinach': '🥬', 'épinard': '🥬', 'szpinak': '🥬',
-        'cucumber': '🥒', 'concombre': '🥒', 'ogórek': '🥒',
-        'corn': '🌽', 'maïs': '🌽', 'kukurydza': '🌽',
-        'mushroom': '🍄', 'champignon': '🍄', 'grzyb': '🍄',
-        'eggplant': '🍆', 'aubergine': '🍆', 'bakłażan': '🍆',
-        'zucchini': '🥒', 'courgette': '🥒', 'cukinia': '🥒',
-        'pumpkin': '🎃', 'citrouille': '🎃', 'dynia': '🎃',
-        'cabbage': '🥬', 'chou': '🥬', 'kapusta': '🥬',
-        'celery': '🥬', 'céleri': '🥬', 'seler': '🥬',
-        'asparagus': '🥦', 'asperge': '🥦', 'szparagi': '🥦',
-        'peas': '🟢', 'petit pois': '🟢', 'groszek': '🟢',
-        'beans': '🫘', 'haricot': '🫘', 'fasola': '🫘',
-        'radish': '🔴', 'radis': '🔴', 'rzodkiewka': '🔴',
-        
-        # Fruits
-        'apple': '🍎', 'pomme': '🍎', 'jabłko': '🍎',
-        'banana': '🍌', 'banane': '🍌', 'banan': '🍌',
-        'orange': '🍊', 'pomarańcza': '🍊',
-        'lemon': '🍋', 'citron': '🍋', 'cytryna': '🍋',
-        'lime': '🍋', 'citron vert': '🍋', 'limonka': '🍋',
-        'strawberry': '🍓', 'fraise': '🍓', 'truskawka': '🍓',
-        'grape': '🍇', 'raisin': '🍇', 'winogrono': '🍇',
-        'watermelon': '🍉', 'pastèque': '🍉', 'arbuz': '🍉',
-        'peach': '🍑', 'pêche': '🍑', 'brzoskwinia': '🍑',
-        'pear': '🍐', 'poire': '🍐', 'gruszka': '🍐',
-        'cherry': '🍒', 'cerise': '🍒', 'wiśnia': '🍒',
-        'pineapple': '🍍', 'ananas': '🍍',
-        'mango': '🥭', 'mangue': '🥭',
-        'coconut': '🥥', 'noix de coco': '🥥', 'kokos': '🥥',
-        'kiwi': '🥝',
-        'avocado': '🥑', 'avocat': '🥑', 'awokado': '🥑',
-        'melon': '🍈',
-        'blueberry': '🫐', 'myrtille': '🫐', 'borówka': '🫐',
-        
-        # Dairy
-        'milk': '🥛', 'lait': '🥛', 'mleko': '🥛',
-        'cheese': '🧀', 'fromage': '🧀', 'ser': '🧀',
-        'butter': '🧈', 'beurre': '🧈', 'masło': '🧈',
-        'yogurt': '🥛', 'yaourt': '🥛', 'jogurt': '🥛',
-        'cream': '🥛', 'crème': '🥛', 'śmietana': '🥛',
-        
-        # Grains & Carbs
-        'bread': '🍞', 'pain': '🍞', 'chleb': '🍞',
-        'rice': '🍚', 'riz': '🍚', 'ryż': '🍚',
-        'pasta': '🍝', 'pâtes': '🍝', 'makaron': '🍝',
-        'noodle': '🍜', 'nouille': '🍜',
-        'flour': '🌾', 'farine': '🌾', 'mąka': '🌾',
-        'cereal': '🥣', 'céréale': '🥣', 'płatki': '🥣',
-        'oat': '🌾', 'avoine': '🌾', 'owies': '🌾',
-        'croissant': '🥐',
-        'bagel': '🥯',
-        'pretzel': '🥨',
-        'pancake': '🥞', 'crêpe': '🥞', 'naleśnik': '🥞',
-        'waffle': '🧇', 'gaufre': '🧇',
-        'tortilla': '🫓', 'wrap': '🫓',
-        'pizza': '🍕',
-        
-        # Condiments & Sauces
-        'salt': '🧂', 'sel': '🧂', 'sól': '🧂',
-        'honey': '🍯', 'miel': '🍯', 'miód': '🍯',
-        'oil': '🫒', 'huile': '🫒', 'olej': '🫒',
-        'olive': '🫒',
-        'vinegar': '🍶', 'vinaigre': '🍶', 'ocet': '🍶',
-        'sauce': '🥫', 'sos': '🥫',
-        'ketchup': '🍅',
-        'mustard': '🟡', 'moutarde': '🟡', 'musztarda': '🟡',
-        'mayonnaise': '🥚', 'mayo': '🥚', 'majonez': '🥚',
-        'soy': '🥢', 'soja': '🥢',
-        
-        # Drinks
-        'water': '💧', 'eau': '💧', 'woda': '💧',
-        'juice': '🧃', 'jus': '🧃', 'sok': '🧃',
-        'coffee': '☕', 'café': '☕', 'kawa': '☕',
-        'tea': '🍵', 'thé': '🍵', 'herbata': '🍵',
-        'wine': '🍷', 'vin': '🍷', 'wino': '🍷',
-        'beer': '🍺', 'bière': '🍺', 'piwo': '🍺',
-        
-        # Nuts & Seeds
-        'nut': '🥜', 'noix': '🥜', 'orzech': '🥜',
-        'peanut': '🥜', 'cacahuète': '🥜', 'orzeszek': '🥜',
-        'almond': '🌰', 'amande': '🌰', 'migdał': '🌰',
-        'chestnut': '🌰', 'châtaigne': '🌰', 'kasztan': '🌰',
-        
-        # Sweets
-        'chocolate': '🍫', 'chocolat': '🍫', 'czekolada': '🍫',
-        'candy': '🍬', 'bonbon': '🍬', 'cukierek': '🍬',
-        'cookie': '🍪', 'biscuit': '🍪', 'ciastko': '🍪',
-        'cake': '🍰', 'gâteau': '🍰', 'ciasto': '🍰',
-        'ice cream': '🍦', 'glace': '🍦', 'lody': '🍦',
-        'sugar': '🍬', 'sucre': '🍬', 'cukier': '🍬',
-        
-        # Herbs & Spices
-        'herb': '🌿', 'herbe': '🌿', 'zioła': '🌿',
-        'basil': '🌿', 'basilic': '🌿', 'bazylia': '🌿',
-        'parsley': '🌿', 'persil': '🌿', 'pietruszka': '🌿',
-        'mint': '🌿', 'menthe': '🌿', 'mięta': '🌿',
-        'thyme': '🌿', 'thym': '🌿', 'tymianek': '🌿',
-        'rosemary': '🌿', 'romarin': '🌿', 'rozmaryn': '🌿',
-        'cinnamon': '🟤', 'cannelle': '🟤', 'cynamon': '🟤',
-        'ginger': '🫚', 'gingembre': '🫚', 'imbir': '🫚',
-        'chili': '🌶️', 'piment': '🌶️',
-        'pepper': '🌶️', 'poivre': '🌶️', 'pieprz': '🌶️',
-        
-        # Seafood
-        'crab': '🦀', 'crabe': '🦀', 'krab': '🦀',
-        'lobster': '🦞', 'homard': '🦞', 'homar': '🦞',
-        'oyster': '🦪', 'huître': '🦪', 'ostryga': '🦪',
-        'squid': '🦑', 'calamar': '🦑', 'kałamarnica': '🦑',
-        'octopus': '🐙', 'poulpe': '🐙', 'ośmiornica': '🐙',
-    }
-    
-    # Check for exact matches first
-    for key, emoji in emoji_map.items():
+    # Check for exact matches first, then multi-word names
+    emoji = INGREDIENT_EMOJIS.get(ingredient_lower)
+    if emoji:
+        return emoji
+    for key, emoji in MULTI_WORD_INGREDIENTS:
         if key in ingredient_lower:
             return emoji
     
+    # Then the words of the name from last to first, so the head noun beats its modifier
+    # ("cherry tomatoes", "butter lettuce"), each word exactly or as a longer word ("tomatoes")
+    for word in reversed(INGREDIENT_WORD_RE.findall(ingredient_lower)):
+        emoji = INGREDIENT_EMOJIS.get(word)
+        if emoji:
+            return emoji
+        for key, emoji in INGREDIENT_EMOJIS.items():
+            if key in word:
+                return emoji
+    
     # Default emoji for unknown ingredients
     return '🍴'
 
 
-
-
-def parse_recipe_names(recipes_text: str) -> list:
-    """Extract recipe names from the generated recipes text."""
-    recipe_names = []
-    lines = recipes_text.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        # Look for lines that start with "1.", "2.", "3." 
-        if line and len(line) > 3:
-            # Check if line starts with a number followed by . 
-            if line[0].isdigit() and '.' in line[:3]:
-                # Extract everything after "1. " or "1."
-                name = line[2:].strip().lstrip('. ')
-                
-                # If there's markdown bold **, extract from between them
-                if '**' in name:
-                    parts = name.split('**')
-                    if len(parts) >= 2:
-                        name = parts[1].strip()
-                
-                # Remove leading emoji if present (emojis are > 127 in unicode)
-                while name and ord(name[0]) > 127:
-                    name = name[1:].strip()
-                
-                # Stop at line break indicators or sub-sections
-                for stop_marker in [' - ', ' – ', '\n', '**']:
-                    if stop_marker in name:
-                        name = name.split(stop_marker)[0].strip()
-                
-                # Filter out non-recipe lines (instructions, etc.)
-                # Recipe names are typically shorter and don't contain certain patterns
-                skip_patterns = ['cook', 'boil', 'slice', 'dice', 'chop', 'mix', 'stir', 
-                                'bake', 'fry', 'heat', 'add', 'pour', 'season', 'place',
-                                'cuire', 'couper', 'mélanger', 'ajouter', 'verser',
-                                'gotować', 'kroić', 'mieszać', 'dodać',
-                                'minutes', 'mins', 'until', 'then']
-                
-                name_lower = name.lower()
-                is_instruction = any(pattern in name_lower for pattern in skip_patterns)
-                
-                if name and len(name) > 2 and len(name) < 80 and not is_instruction:
-                    recipe_names.append(name)
-    
-    return recipe_names[:3]  # Max 3 recipes
-
-
-def get_recipe_emojis(recipe_name: str) -> str:
-    """Get 2-4 emojis for a recipe based on ingredients and cooking style."""
-    recipe_lower = recipe_name.lower()
-    emojis = []
-    
+# Recipe emojis in display order, each with the keywords that select it in every language
+RECIPE_EMOJI_KEYWORDS = [
     # Main protein/ingredient
-    if any(word in recipe_lower for word in ['chicken', 'poulet', 'kurczak']):
-        emojis.append('🍗')
-    if any(word in recipe_lower for word in ['beef', 'boeuf', 'bœuf', 'steak', 'wołowina']):
-        emojis.append('🥩')
-    if any(word in recipe_lower for word in ['pork', 'porc', 'wieprzowina']):
-        emojis.append('🥓')
-    if any(word in recipe_lower for word in ['fish', 'poisson', 'ryba', 'salmon', 'saumon', 'łosoś']):
-        emojis.append('🐟')
-    if any(word in recipe_lower for word in ['shrimp', 'crevette', 'krewetk', 'seafood']):
-        emojis.append('🦐')
-    if any(word in recipe_lower for word in ['egg', 'oeuf', 'œuf', 'jajko', 'omelette', 'omlet']):
-        emojis.append('🍳')
-    
+    ('🍗', ('chicken', 'poulet', 'kurczak')),
+    ('🥩', ('beef', 'boeuf', 'bœuf', 'steak', 'wołowina')),
+    ('🥓', ('pork', 'porc', 'wieprzowina')),
+    ('🐟', ('fish', 'poisson', 'ryba', 'salmon', 'saumon', 'łosoś')),
+    ('🦐', ('shrimp', 'crevette', 'krewetk', 'seafood')),
+    ('🍳', ('egg', 'oeuf', 'œuf', 'jajko', 'omelette', 'omlet')),
     # Dish type
-    if any(word in recipe_lower for word in ['salad', 'salade', 'sałatka']):
-        emojis.append('🥗')
-    if any(word in recipe_lower for word in ['soup', 'soupe', 'zupa']):
-        emojis.append('🍲')
-    if any(word in recipe_lower for word in ['pasta', 'spaghetti', 'pâtes', 'makaron', 'noodle', 'primavera']):
-        emojis.append('🍝')
-    if any(word in recipe_lower for word in ['pizza']):
-        emojis.append('🍕')
-    if any(word in recipe_lower for word in ['burger', 'hamburger']):
-        emojis.append('🍔')
-    if any(word in recipe_lower for word in ['sandwich', 'panini']):
-        emojis.append('🥪')
-    if any(word in recipe_lower for word in ['taco', 'burrito', 'mexican', 'mexicain']):
-        emojis.append('🌮')
-    if any(word in recipe_lower for word in ['curry']):
-        emojis.append('🍛')
-    if any(word in recipe_lower for word in ['rice', 'riz', 'ryż', 'risotto']):
-        emojis.append('🍚')
-    if any(word in recipe_lower for word in ['stir fry', 'wok', 'sauté', 'asian', 'asiatique']):
-        emojis.append('🥘')
-    
+    ('🥗', ('salad', 'salade', 'sałatka')),
+    ('🍲', ('soup', 'soupe', 'zupa')),
+    ('🍝', ('pasta', 'spaghetti', 'pâtes', 'makaron', 'noodle', 'primavera')),
+    ('🍕', ('pizza',)),
+    ('🍔', ('burger', 'hamburger')),
+    ('🥪', ('sandwich', 'panini')),
+    ('🌮', ('taco', 'burrito', 'mexican', 'mexicain')),
+    ('🍛', ('curry',)),
+    ('🍚', ('rice', 'riz', 'ryż', 'risotto')),
+    ('🥘', ('stir fry', 'wok', 'sauté', 'asian', 'asiatique')),
     # Vegetables
-    if any(word in recipe_lower for word in ['vegetable', 'légume', 'warzywo', 'veggie', 'primavera']):
-        emojis.append('🥬')
-    if any(word in recipe_lower for word in ['tomato', 'tomate', 'pomidor']):
-        emojis.append('🍅')
-    if any(word in recipe_lower for word in ['pepper', 'poivron', 'papryka']):
-        emojis.append('🫑')
-    if any(word in recipe_lower for word in ['mushroom', 'champignon', 'grzyb']):
-        emojis.append('🍄')
-    if any(word in recipe_lower for word in ['carrot', 'carotte', 'marchew']):
-        emojis.append('🥕')
-    
+    ('🥬', ('vegetable', 'légume', 'warzywo', 'veggie', 'primavera')),
+    ('🍅', ('tomato', 'tomate', 'pomidor')),
+    ('🫑', ('pepper', 'poivron', 'papryka')),
+    ('🍄', ('mushroom', 'champignon', 'grzyb')),
+    ('🥕', ('carrot', 'carotte', 'marchew')),
     # Flavor profiles
-    if any(word in recipe_lower for word in ['lemon', 'citron', 'cytryn']):
-        emojis.append('🍋')
-    if any(word in recipe_lower for word in ['garlic', 'ail', 'czosnek']):
-        emojis.append('🧄')
-    if any(word in recipe_lower for word in ['cheese', 'fromage', 'ser', 'parmesan']):
-        emojis.append('🧀')
-    if any(word in recipe_lower for word in ['spicy', 'épicé', 'pikantny', 'chili']):
-        emojis.append('🌶️')
-    if any(word in recipe_lower for word in ['herb', 'herbe', 'zioł']):
-        emojis.append('🌿')
-    
+    ('🍋', ('lemon', 'citron', 'cytryn')),
+    ('🧄', ('garlic', 'ail', 'czosnek')),
+    ('🧀', ('cheese', 'fromage', 'ser', 'parmesan')),
+    ('🌶️', ('spicy', 'épicé', 'pikantny', 'chili')),
+    ('🌿', ('herb', 'herbe', 'zioł')),
     # Cooking style
-    if any(word in recipe_lower for word in ['grill', 'bbq', 'barbecue']):
-        emojis.append('🔥')
-    if any(word in recipe_lower for word in ['roast', 'rôti', 'pieczony', 'baked']):
-        emojis.append('🍖')
-    if any(word in recipe_lower for word in ['fried', 'frit', 'smażony', 'crispy']):
-        emojis.append('✨')
-    
+    ('🔥', ('grill', 'bbq', 'barbecue')),
+    ('🍖', ('roast', 'rôti', 'pieczony', 'baked')),
+    ('✨', ('fried', 'frit', 'smażony', 'crispy')),
     # Desserts
-    if any(word in recipe_lower for word in ['cake', 'gâteau', 'ciasto', 'dessert']):
-        emojis.append('🍰')
-    if any(word in recipe_lower for word in ['chocolate', 'chocolat', 'czekolada']):
-        emojis.append('🍫')
-    if any(word in recipe_lower for word in ['fruit', 'smoothie']):
-        emojis.append('🍓')
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_emojis = []
-    for e in emojis:
-        if e not in seen:
-            seen.add(e)
-            unique_emojis.append(e)
+    ('🍰', ('cake', 'gâteau', 'ciasto', 'dessert')),
+    ('🍫', ('chocolate', 'chocolat', 'czekolada')),
+    ('🍓', ('fruit', 'smoothie')),
+]
+# Keyword -> its positions in RECIPE_EMOJI_KEYWORDS ("primavera" is both pasta and vegetables)
+RECIPE_KEYWORD_EMOJIS = {
+    keyword: [position for position, (_, words) in enumerate(RECIPE_EMOJI_KEYWORDS) if keyword in words]
+    for _, keywords in RECIPE_EMOJI_KEYWORDS
+    for keyword in keywords
+}
+# One pass over the name finds every keyword; the lookahead lets keywords overlap ("dessert" and "ser")
+RECIPE_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(RECIPE_KEYWORD_EMOJIS, key=len, reverse=True)) + "))"
+)
+
+
+@lru_cache(maxsize=2048)
+def get_recipe_emojis(recipe_name: str) -> str:
+    """Get 2-4 emojis for a recipe based on ingredients and cooking style."""
+    positions = {
+        position
+        for keyword in RECIPE_KEYWORD_RE.findall(recipe_name.lower())
+        for position in RECIPE_KEYWORD_EMOJIS[keyword]
+    }
+    # Keep the display order and remove duplicates
+    unique_emojis = list(dict.fromkeys(RECIPE_EMOJI_KEYWORDS[p][0] for p in sorted(positions)))
     
     # Return 2-4 emojis, or default if none found
     if len(unique_emojis) == 0:
@@ -323,335 +298,78 @@ def get_recipe_emojis(recipe_name: str) -> str:
         return ''.join(unique_emojis[:4])
 
 
+# Section labels of a formatted recipe, per language
+RECIPE_LABELS = {
+    "en": {"difficulty": "Difficulty", "time": "Time", "ingredients": "Ingredients", 
+           "missing": "Missing", "instructions": "Instructions", "tip": "Pro tip"},
+    "fr": {"difficulty": "Difficulté", "time": "Temps", "ingredients": "Ingrédients",
+           "missing": "Manquants", "instructions": "Instructions", "tip": "Astuce"},
+    "pl": {"difficulty": "Trudność", "time": "Czas", "ingredients": "Składniki",
+           "missing": "Brakujące", "instructions": "Instrukcje", "tip": "Wskazówka"}
+}
+
+
 def format_recipe_for_display(recipe: dict, index: int, lang: str) -> str:
     """Format a single recipe for markdown display."""
-    labels = {
-        "en": {"difficulty": "Difficulty", "time": "Time", "ingredients": "Ingredients", 
-               "missing": "Missing", "instructions": "Instructions", "tip": "Pro tip"},
-        "fr": {"difficulty": "Difficulté", "time": "Temps", "ingredients": "Ingrédients",
-               "missing": "Manquants", "instructions": "Instructions", "tip": "Astuce"},
-        "pl": {"difficulty": "Trudność", "time": "Czas", "ingredients": "Składniki",
-               "missing": "Brakujące", "instructions": "Instrukcje", "tip": "Wskazówka"}
-    }
-    l = labels.get(lang, labels["en"])
+    l = RECIPE_LABELS.get(lang, RECIPE_LABELS["en"])
     
     emojis = get_recipe_emojis(recipe.get("name", ""))
     
-    md = f"### {index}. {emojis} {recipe.get('name', 'Recipe')}\n\n"
-    md += f"**{l['difficulty']}:** {recipe.get('difficulty', 'N/A')} | "
-    md += f"**{l['time']}:** {recipe.get('time', 'N/A')}\n\n"
+    # Collect the lines and join them once at the end
+    parts = [
+        f"### {index}. {emojis} {recipe.get('name', 'Recipe')}\n\n",
+        f"**{l['difficulty']}:** {recipe.get('difficulty', 'N/A')} | ",
+        f"**{l['time']}:** {recipe.get('time', 'N/A')}\n\n",
+    ]
     
     # Ingredients
-    md += f"**{l['ingredients']}:**\n"
-    for ing in recipe.get("ingredients", []):
-        md += f"- {get_ingredient_emoji(ing)} {ing}\n"
+    parts.append(f"**{l['ingredients']}:**\n")
+    parts.extend(f"- {get_ingredient_emoji(ing)} {ing}\n" for ing in recipe.get("ingredients", []))
     
     # Missing ingredients
     missing = recipe.get("missing_ingredients", [])
     if missing:
-        md += f"\n**⚠️ {l['missing']}:**\n"
-        for ing in missing:
-            md += f"- {get_ingredient_emoji(ing)} {ing}\n"
+        parts.append(f"\n**⚠️ {l['missing']}:**\n")
+        parts.extend(f"- {get_ingredient_emoji(ing)} {ing}\n" for ing in missing)
     
     # Instructions
-    md += f"\n**{l['instructions']}:**\n"
-    for i, step in enumerate(recipe.get("instructions", []), 1):
-        md += f"{i}. {step}\n"
+    parts.append(f"\n**{l['instructions']}:**\n")
+    parts.extend(f"{i}. {step}\n" for i, step in enumerate(recipe.get("instructions", []), 1))
     
     # Tip
     tip = recipe.get("tip", "")
     if tip:
-        md += f"\n💡 **{l['tip']}:** {tip}\n"
-    
-    return md
-
-
-
-# Translations
-TRANSLATIONS = {
-    "en": {
-        "title": "🍳 Fridge to Recipe",
-        "subtitle": "Snap a photo of your ingredients and discover delicious recipes!",
-        "preferences": "⚙️ Dietary Preferences",
-        "dietary_requirements": "Dietary Requirements",
-        "preferred_cuisine": "Preferred Cuisine",
-        "cuisine_any": "Any",
-        "add_ingredients": "### 📸 Add Your Ingredients",
-        "take_photo": "📷 Take Photo",
-        "upload_image": "📁 Upload Image",
-        "camera_help": "Point at your fridge or ingredients",
-        "upload_help": "Choose an image",
-        "your_ingredients": "Your ingredients",
-        "photos_count": "📷 {count} photo(s) selected",
-        "clear_photos": "🗑️ Clear All",
-        "detect_ingredients": "🔍 Detect Ingredients",
-        "find_recipes": "🍳 Find Recipes",
-        "finding_recipes": "Finding delicious recipes...",
-        "regenerate_recipes": "🔄 Regenerate Recipes",
-        "modify_ingredients": "Modify ingredients if needed, then regenerate",
-        "find_recipes": "🍳 Find Recipes",
-        "edit_ingredients": "✏️ Edit Ingredients",
-        "edit_ingredients_help": "Remove or add ingredients before searching for recipes",
-        "ingredients_detected_title": "### 🥗 Detected Ingredients",
-        "validate_ingredients": "✅ Confirm & Find Recipes",
-        "redetect": "🔄 Re-detect",
-        "new_search": "🔄 New Search",
-        "add_ingredient": "Add an ingredient...",
-        "add_button": "➕ Add",
-        "select_model": "🤖 AI Model",
-        "model_claude": "Claude (Anthropic)",
-        "model_gpt4": "GPT-4o (OpenAI)",
-        "model_gpt4_mini": "GPT-4o-mini (OpenAI)",
-        "kids_mode": "👶 Easy for kids",
-        "kids_mode_help": "Simple recipes that children can help make",
-        "kids_mode_short": "Kids mode",
-        "kids_mode_tooltip": "Cooking with kids? Enable kids mode!",
-        "diet_label": "Diet",
-        "diet_none": "None",
-        "cuisine_label": "Cuisine",
-        "cuisine_all": "All",
-        "step_1": "STEP 1",
-        "your_photos": "Your ingredient photos",
-        "analyzing": "🔍 Analyzing your ingredients...",
-        "creating_recipes": "👨‍🍳 Creating recipe suggestions...",
-        "done": "✅ Done!",
-        "recipes_ready": "✅ Recipes ready!",
-        "detected_ingredients": "🥗 Detected Ingredients",
-        "your_recipes": "### 👨‍🍳 Your Recipes",
-        "save_recipes": "📥 Save Recipes",
-        "history": "📜 History",
-        "load_recent": "Load Recent",
-        "no_history": "No history yet!",
-        "configure_supabase": "Configure Supabase to save history",
-        "tips": "Tips:",
-        "tip_lighting": "Good lighting helps!",
-        "tip_labels": "Show labels clearly",
-        "tip_include": "Include all ingredients",
-        "footer": "Made with ❤️ using Streamlit & Claude AI",
-        "footer_tip": "Tip: Good lighting = better results!",
-        "error_api_key": "⚠️ No AI API key found. Please configure ANTHROPIC_API_KEY or OPENAI_API_KEY in your secrets.",
-        "error_api_key_info": "Get API keys from: https://console.anthropic.com/ or https://platform.openai.com/",
-        "error_busy": "The AI service is currently busy. Please try again in a few moments.",
-        "error_rate_limit": "Rate limit reached. Please wait a minute before trying again.",
-        "error_connection": "Could not connect to AI service. Please check your internet connection.",
-        "error_tip": "💡 Tip: Wait a few seconds and try again. The AI service may be temporarily busy.",
-        "dietary_options": ["Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Keto", "Low-Carb", "Nut-Free"],
-        "cuisine_options": ["Any", "Italian", "Asian", "Mexican", "Indian", "Mediterranean", "American", "French"],
-        "ingredients_prompt": """Analyze this image and identify all visible food ingredients.
-
-Return ONLY a simple list of ingredients, one per line, with a dash before each:
-- ingredient 1
-- ingredient 2
-- ingredient 3
-
-Be specific (e.g., "cherry tomatoes" not just "tomatoes"). Only list actual food items you can clearly see. Do not include categories or headers.""",
-        "recipes_prompt": """Based on these available ingredients:
+        parts.append(f"\n💡 **{l['tip']}:** {tip}\n")
+    
+    return "".join(parts)
 
-{ingredients}
-{preferences}
 
-Suggest 3 recipes that can be made primarily with these ingredients. For each recipe, provide:
-
-1. **Recipe Name** (with emoji)
-   - Difficulty: Easy/Medium/Hard
-   - Time: estimated cooking time
-   - Ingredients needed (mark any NOT in the list with ⚠️)
-   - Brief cooking instructions (5-7 steps)
-   - Pro tip for the dish
-
-Focus on practical, delicious recipes that make good use of the available ingredients. Minimize additional ingredients needed."""
-    },
-    "fr": {
-        "title": "🍳 Frigo en Recettes",
-        "subtitle": "Prenez une photo de vos ingrédients et découvrez de délicieuses recettes !",
-        "preferences": "⚙️ Préférences Alimentaires",
-        "dietary_requirements": "Régimes Alimentaires",
-        "preferred_cuisine": "Cuisine Préférée",
-        "cuisine_any": "Toutes",
-        "add_ingredients": "### 📸 Ajoutez Vos Ingrédients",
-        "take_photo": "📷 Prendre Photo",
-        "upload_image": "📁 Importer Image",
-        "camera_help": "Visez votre frigo ou vos ingrédients",
-        "upload_help": "Choisir une image",
-        "your_ingredients": "Vos ingrédients",
-        "photos_count": "📷 {count} photo(s) sélectionnée(s)",
-        "clear_photos": "🗑️ Tout Effacer",
-        "detect_ingredients": "🔍 Détecter les Ingrédients",
-        "find_recipes": "🍳 Trouver des recettes",
-        "finding_recipes": "Recherche de recettes délicieuses...",
-        "regenerate_recipes": "🔄 Régénérer les recettes",
-        "modify_ingredients": "Modifiez les ingrédients si besoin, puis régénérez",
-        "find_recipes": "🍳 Trouver des Recettes",
-        "edit_ingredients": "✏️ Modifier les Ingrédients",
-        "edit_ingredients_help": "Supprimez ou ajoutez des ingrédients avant de chercher des recettes",
-        "ingredients_detected_title": "### 🥗 Ingrédients Détectés",
-        "validate_ingredients": "✅ Confirmer & Trouver des Recettes",
-        "redetect": "🔄 Re-détecter",
-        "new_search": "🔄 Nouvelle Recherche",
-        "add_ingredient": "Ajouter un ingrédient...",
-        "add_button": "➕ Ajouter",
-        "select_model": "🤖 Modèle IA",
-        "model_claude": "Claude (Anthropic)",
-        "model_gpt4": "GPT-4o (OpenAI)",
-        "model_gpt4_mini": "GPT-4o-mini (OpenAI)",
-        "kids_mode": "👶 Facile pour enfants",
-        "kids_mode_help": "Recettes simples que les enfants peuvent aider à préparer",
-        "kids_mode_short": "Mode enfants",
-        "kids_mode_tooltip": "On cuisine avec les enfants ? Activez le mode enfants !",
-        "diet_label": "Régime",
-        "diet_none": "Aucun",
-        "cuisine_label": "Cuisine",
-        "cuisine_all": "Toutes",
-        "step_1": "ÉTAPE 1",
-        "your_photos": "Vos photos d'ingrédients",
-        "analyzing": "🔍 Analyse de vos ingrédients...",
-        "creating_recipes": "👨‍🍳 Création des suggestions de recettes...",
-        "done": "✅ Terminé !",
-        "recipes_ready": "✅ Recettes prêtes !",
-        "detected_ingredients": "🥗 Ingrédients Détectés",
-        "your_recipes": "### 👨‍🍳 Vos Recettes",
-        "save_recipes": "📥 Sauvegarder",
-        "history": "📜 Historique",
-        "load_recent": "Charger",
-        "no_history": "Pas encore d'historique !",
-        "configure_supabase": "Configurez Supabase pour sauvegarder l'historique",
-        "tips": "Conseils :",
-        "tip_lighting": "Un bon éclairage aide !",
-        "tip_labels": "Montrez les étiquettes",
-        "tip_include": "Incluez tous les ingrédients",
-        "footer": "Fait avec ❤️ avec Streamlit & Claude AI",
-        "footer_tip": "Conseil : Bon éclairage = meilleurs résultats !",
-        "error_api_key": "⚠️ Aucune clé API IA trouvée. Configurez ANTHROPIC_API_KEY ou OPENAI_API_KEY.",
-        "error_api_key_info": "Obtenez vos clés API sur : console.anthropic.com ou platform.openai.com",
-        "error_busy": "Le service IA est actuellement occupé. Veuillez réessayer dans quelques instants.",
-        "error_rate_limit": "Limite de requêtes atteinte. Veuillez patienter une minute.",
-        "error_connection": "Impossible de se connecter au service IA. Vérifiez votre connexion internet.",
-        "error_tip": "💡 Conseil : Attendez quelques secondes et réessayez.",
-        "dietary_options": ["Végétarien", "Végan", "Sans Gluten", "Sans Lactose", "Keto", "Low-Carb", "Sans Noix"],
-        "cuisine_options": ["Toutes", "Italienne", "Asiatique", "Mexicaine", "Indienne", "Méditerranéenne", "Américaine", "Française"],
-        "ingredients_prompt": """Analysez cette image et identifiez tous les ingrédients alimentaires visibles.
-
-Retournez UNIQUEMENT une liste simple d'ingrédients, un par ligne, avec un tiret devant chaque :
-- ingrédient 1
-- ingrédient 2
-- ingrédient 3
-
-Soyez précis (ex: "tomates cerises" plutôt que "tomates"). Listez uniquement les aliments que vous pouvez clairement voir. N'incluez pas de catégories ou d'en-têtes.""",
-        "recipes_prompt": """Basé sur ces ingrédients disponibles :
+def format_recipes_for_download(recipe_list: list, lang: str) -> str:
+    """Format all recipes as one text for the download button."""
+    return "\n\n".join([format_recipe_for_display(r, i, lang) for i, r in enumerate(recipe_list, 1)])
 
-{ingredients}
-{preferences}
 
-Suggérez 3 recettes réalisables principalement avec ces ingrédients. Pour chaque recette, fournissez :
-
-1. **Nom de la Recette** (avec emoji)
-   - Difficulté : Facile/Moyen/Difficile
-   - Temps : temps de préparation estimé
-   - Ingrédients nécessaires (marquez ceux NON dans la liste avec ⚠️)
-   - Instructions de cuisson (5-7 étapes)
-   - Astuce du chef
-
-Concentrez-vous sur des recettes pratiques et délicieuses. Minimisez les ingrédients supplémentaires nécessaires."""
-    },
-    "pl": {
-        "title": "🍳 Z Lodówki na Talerz",
-        "subtitle": "Zrób zdjęcie swoich składników i odkryj pyszne przepisy!",
-        "preferences": "⚙️ Preferencje Dietetyczne",
-        "dietary_requirements": "Wymagania Dietetyczne",
-        "preferred_cuisine": "Preferowana Kuchnia",
-        "cuisine_any": "Dowolna",
-        "add_ingredients": "### 📸 Dodaj Swoje Składniki",
-        "take_photo": "📷 Zrób Zdjęcie",
-        "upload_image": "📁 Wgraj Obraz",
-        "camera_help": "Skieruj na lodówkę lub składniki",
-        "upload_help": "Wybierz obraz",
-        "your_ingredients": "Twoje składniki",
-        "photos_count": "📷 Wybrano {count} zdjęć",
-        "clear_photos": "🗑️ Wyczyść Wszystko",
-        "detect_ingredients": "🔍 Wykryj Składniki",
-        "find_recipes": "🍳 Znajdź przepisy",
-        "finding_recipes": "Szukam pysznych przepisów...",
-        "regenerate_recipes": "🔄 Wygeneruj ponownie",
-        "modify_ingredients": "Zmodyfikuj składniki jeśli potrzebujesz, a potem wygeneruj ponownie",
-        "find_recipes": "🍳 Znajdź Przepisy",
-        "edit_ingredients": "✏️ Edytuj Składniki",
-        "edit_ingredients_help": "Usuń lub dodaj składniki przed wyszukaniem przepisów",
-        "ingredients_detected_title": "### 🥗 Wykryte Składniki",
-        "validate_ingredients": "✅ Potwierdź i Znajdź Przepisy",
-        "redetect": "🔄 Wykryj Ponownie",
-        "new_search": "🔄 Nowe Wyszukiwanie",
-        "add_ingredient": "Dodaj składnik...",
-        "add_button": "➕ Dodaj",
-        "select_model": "🤖 Model AI",
-        "model_claude": "Claude (Anthropic)",
-        "model_gpt4": "GPT-4o (OpenAI)",
-        "model_gpt4_mini": "GPT-4o-mini (OpenAI)",
-        "kids_mode": "👶 Łatwe dla dzieci",
-        "kids_mode_help": "Proste przepisy, przy których dzieci mogą pomagać",
-        "kids_mode_short": "Tryb dla dzieci",
-        "kids_mode_tooltip": "Gotujesz z dziećmi? Włącz tryb dla dzieci!",
-        "diet_label": "Dieta",
-        "diet_none": "Brak",
-        "cuisine_label": "Kuchnia",
-        "cuisine_all": "Wszystkie",
-        "step_1": "KROK 1",
-        "your_photos": "Twoje zdjęcia składników",
-        "analyzing": "🔍 Analizowanie składników...",
-        "creating_recipes": "👨‍🍳 Tworzenie propozycji przepisów...",
-        "done": "✅ Gotowe!",
-        "recipes_ready": "✅ Przepisy gotowe!",
-        "detected_ingredients": "🥗 Wykryte Składniki",
-        "your_recipes": "### 👨‍🍳 Twoje Przepisy",
-        "save_recipes": "📥 Zapisz Przepisy",
-        "history": "📜 Historia",
-        "load_recent": "Załaduj",
-        "no_history": "Brak historii!",
-        "configure_supabase": "Skonfiguruj Supabase aby zapisywać historię",
-        "tips": "Wskazówki:",
-        "tip_lighting": "Dobre oświetlenie pomaga!",
-        "tip_labels": "Pokaż etykiety wyraźnie",
-        "tip_include": "Uwzględnij wszystkie składniki",
-        "footer": "Stworzone z ❤️ przy użyciu Streamlit & Claude AI",
-        "footer_tip": "Wskazówka: Dobre światło = lepsze wyniki!",
-        "error_api_key": "⚠️ Nie znaleziono klucza API. Skonfiguruj ANTHROPIC_API_KEY lub OPENAI_API_KEY.",
-        "error_api_key_info": "Uzyskaj klucze API na: console.anthropic.com lub platform.openai.com",
-        "error_busy": "Usługa AI jest obecnie zajęta. Spróbuj ponownie za chwilę.",
-        "error_rate_limit": "Osiągnięto limit zapytań. Poczekaj minutę przed ponowną próbą.",
-        "error_connection": "Nie można połączyć się z usługą AI. Sprawdź połączenie internetowe.",
-        "error_tip": "💡 Wskazówka: Poczekaj kilka sekund i spróbuj ponownie.",
-        "dietary_options": ["Wegetariańskie", "Wegańskie", "Bezglutenowe", "Bez Laktozy", "Keto", "Low-Carb", "Bez Orzechów"],
-        "cuisine_options": ["Dowolna", "Włoska", "Azjatycka", "Meksykańska", "Indyjska", "Śródziemnomorska", "Amerykańska", "Francuska"],
-        "ingredients_prompt": """Przeanalizuj ten obraz i zidentyfikuj wszystkie widoczne składniki spożywcze.
-
-Zwróć TYLKO prostą listę składników, jeden na linię, z myślnikiem przed każdym:
-- składnik 1
-- składnik 2
-- składnik 3
-
-Bądź konkretny (np. "pomidory koktajlowe" zamiast "pomidory"). Wymień tylko produkty spożywcze, które wyraźnie widzisz. Nie dodawaj kategorii ani nagłówków.""",
-        "recipes_prompt": """Na podstawie tych dostępnych składników:
 
-{ingredients}
-{preferences}
+# Translations live in translations/<lang>.json and are loaded the first time a language is used
+TRANSLATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations")
 
-Zaproponuj 3 przepisy, które można przygotować głównie z tych składników. Dla każdego przepisu podaj:
 
-1. **Nazwa Przepisu** (z emoji)
-   - Trudność: Łatwy/Średni/Trudny
-   - Czas: szacowany czas przygotowania
-   - Potrzebne składniki (oznacz te SPOZA listy symbolem ⚠️)
-   - Instrukcje gotowania (5-7 kroków)
-   - Wskazówka szefa kuchni
+@st.cache_resource
+def load_translations(lang: str) -> dict:
+    """Load the translations for one language, once per process."""
+    with open(os.path.join(TRANSLATIONS_DIR, f"{lang}.json"), "rb") as f:
+        return orjson.loads(f.read())
 
-Skup się na praktycznych i pysznych przepisach. Minimalizuj dodatkowe składniki."""
-    }
-}
+
+@lru_cache(maxsize=None)
+def get_translation(lang: str, key: str) -> str:
+    """Look up one translated text, memoized for the current run so repeated labels skip the cache_resource lookup."""
+    return load_translations(lang).get(key, key)
 
 
 def get_text(key: str) -> str:
     """Get translated text for current language."""
-    lang = st.session_state.get('language', 'en')
-    return TRANSLATIONS[lang].get(key, key)
+    return get_translation(st.session_state.get('language', 'en'), key)
 
 # Page configuration
 st.set_page_config(
@@ -661,216 +379,21 @@ st.set_page_config(
     initial_sidebar_state="collapsed"  # Collapsed by default on mobile
 )
 
-# Mobile-friendly CSS
-st.markdown("""
-<style>
-    /* Mobile-first responsive design */
-    .main-header {
-        font-size: clamp(1.8rem, 5vw, 3rem);
-        font-weight: bold;
-        background: linear-gradient(90deg, #FF6B6B, #4ECDC4);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        padding: 0.5rem 0;
-        margin-bottom: 0.5rem;
-    }
-    
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: clamp(0.9rem, 2.5vw, 1.1rem);
-        padding: 0 1rem;
-        margin-bottom: 1rem;
-    }
-    
-    /* Better button styling for touch */
-    .stButton > button {
-        background: linear-gradient(90deg, #FF6B6B, #4ECDC4);
-        color: white;
-        border: none;
-        border-radius: 25px;
-        padding: 0.75rem 1.5rem;
-        font-weight: bold;
-        font-size: 1rem;
-        min-height: 50px;  /* Easier to tap on mobile */
-        width: 100%;
-        touch-action: manipulation;
-    }
-    
-    .stButton > button:hover {
-        transform: scale(1.02);
-        box-shadow: 0 4px 15px rgba(78, 205, 196, 0.4);
-    }
-    
-    /* Tab styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 0;
-        justify-content: center;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        padding: 0.75rem 1.5rem;
-        font-size: 1rem;
-    }
-    
-    /* Image/camera input improvements */
-    [data-testid="stFileUploader"], 
-    [data-testid="stCameraInput"] {
-        border: 2px dashed #4ECDC4;
-        border-radius: 15px;
-        padding: 1rem;
-    }
-    
-    /* Improve readability on small screens */
-    .stMarkdown {
-        font-size: clamp(0.9rem, 2.5vw, 1rem);
-    }
-    
-    /* Better spacing for mobile */
-    .block-container {
-        padding: 1rem 1rem 3rem 1rem;
-        max-width: 100%;
-    }
-    
-    @media (min-width: 768px) {
-        .block-container {
-            padding: 2rem 3rem 3rem 3rem;
-            max-width: 900px;
-        }
-    }
-    
-    /* Expander improvements */
-    .streamlit-expanderHeader {
-        font-size: 1rem;
-        font-weight: 600;
-    }
-    
-    /* Download button */
-    .stDownloadButton > button {
-        background: linear-gradient(90deg, #667eea, #764ba2);
-        color: white;
-        border: none;
-        border-radius: 25px;
-        min-height: 50px;
-    }
-    
-    /* Success/info messages */
-    .stSuccess, .stInfo {
-        border-radius: 10px;
-    }
-    
-    /* Hide hamburger menu on mobile for cleaner look */
-    #MainMenu {visibility: hidden;}
-    
-    /* Footer styling */
-    .footer {
-        text-align: center;
-        color: #888;
-        padding: 1rem;
-        font-size: 0.85rem;
-    }
-    
-    /* Language selector buttons */
-    .stButton > button[kind="secondary"] {
-        background: white !important;
-        border: 2px solid #e0e0e0 !important;
-        color: #333 !important;
-        font-size: 0.9rem;
-        padding: 0.3rem;
-        min-height: 40px;
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        border-color: #667eea !important;
-        background: #f8f8ff !important;
-    }
-    
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(90deg, #667eea, #764ba2) !important;
-        color: white !important;
-        border: none !important;
-    }
-    
-    /* Ingredient delete button */
-    div[data-testid="column"]:first-child .stButton > button {
-        background: transparent;
-        border: none;
-        color: #ff4444;
-        font-size: 0.7rem;
-        padding: 0.1rem;
-        min-height: 24px;
-        min-width: 24px;
-    }
-    
-    div[data-testid="column"]:first-child .stButton > button:hover {
-        background: #ffeeee;
-        transform: scale(1.1);
-    }
-    
-    /* Compact preferences styling */
-    .pref-card {
-        text-align: center;
-        padding: 10px 8px;
-        background: white;
-        border-radius: 12px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    }
-    
-    /* Toggle switch styling */
-    [data-testid="stCheckbox"] > label {
-        justify-content: center;
-    }
-    
-    /* Compact selectbox */
-    [data-testid="stSelectbox"] > div > div {
-        font-size: 12px !important;
-    }
-    
-    /* Photo thumbnails */
-    .photo-thumb-container {
-        position: relative;
-        display: inline-block;
-    }
-    
-    .photo-thumb-container img {
-        border-radius: 10px;
-        object-fit: cover;
-    }
-    
-    /* Remove button on thumbnail */
-    .thumb-remove {
-        position: absolute;
-        top: -5px;
-        right: -5px;
-        background: #ff4444;
-        color: white;
-        border-radius: 50%;
-        width: 18px;
-        height: 18px;
-        font-size: 12px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-    }
-    
-    /* Primary button gradient */
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(90deg, #667eea, #764ba2) !important;
-        border: none !important;
-    }
-    
-    /* Photo section card */
-    .photo-section-card {
-        background: white;
-        padding: 15px;
-        border-radius: 12px;
-        margin-top: 15px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    }
-</style>
-""", unsafe_allow_html=True)
+# Stylesheets live in assets/ and are read and minified once per process
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+@st.cache_resource
+def get_style_tag(filename: str) -> str:
+    """Return a stylesheet from assets/ as a minified <style> tag, built once per process."""
+    with open(os.path.join(ASSETS_DIR, filename), encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css).strip()
+    return f"<style>{css}</style>"
+
+
+st.markdown(get_style_tag("style.css"), unsafe_allow_html=True)
 
 
 # Initialize Supabase client
@@ -883,213 +406,577 @@ def init_supabase() -> Client:
     if not url or not key:
         return None
     
+    from supabase import create_client
     return create_client(url, key)
 
 
 # Initialize Anthropic client
+# The SDK clients retry connection errors, 429s and 5xx (including 529 overloaded) themselves,
+# with exponential backoff, jitter and Retry-After support
+API_MAX_RETRIES = 3
+
+# Both AI clients keep an HTTP/2 connection pool for the process, so parallel requests share warm TLS connections
+API_CONNECTION_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+
 @st.cache_resource
 def init_anthropic():
     """Initialize Anthropic client."""
     api_key = get_secret("ANTHROPIC_API_KEY")
     if not api_key:
         return None
-    return anthropic.Anthropic(api_key=api_key)
+    import anthropic
+    http_client = anthropic.DefaultHttpxClient(http2=True, limits=API_CONNECTION_LIMITS)
+    return anthropic.Anthropic(api_key=api_key, http_client=http_client, max_retries=API_MAX_RETRIES)
 
 
+# Initialize OpenAI client
+@st.cache_resource
 def init_openai():
     """Initialize OpenAI client."""
     api_key = get_secret("OPENAI_API_KEY")
     if not api_key:
         return None
-    return openai.OpenAI(api_key=api_key)
+    import openai
+    http_client = openai.DefaultHttpxClient(http2=True, limits=API_CONNECTION_LIMITS)
+    return openai.OpenAI(api_key=api_key, http_client=http_client, max_retries=API_MAX_RETRIES)
+
 
+def get_retry_after(response: httpx.Response) -> float:
+    """Seconds the server asked to wait in its Retry-After header, or 0 when it gave none."""
+    try:
+        return max(0.0, float(response.headers.get("retry-after", 0)))
+    except ValueError:
+        return 0.0
+
+
+class RateLimiter:
+    """Client-side budget of requests and input tokens per minute, shared by all sessions of the process.
+    
+    Requests wait in acquire() until the last minute's usage leaves room for them, instead of being
+    sent and rejected. The request budget is halved after a rate-limit error and grows back by one
+    request per success (additive increase, multiplicative decrease). A rate-limit error that comes
+    with a Retry-After header also holds every request back until the server allows them again.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.max_requests = requests_per_minute
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = tokens_per_minute
+        self.sent = deque()  # (time, estimated tokens) of the requests of the last minute
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: int):
+        """Block until a request of about `tokens` input tokens fits in the budget, then record it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    # Spread the held-back requests out so they don't all resume at the same instant
+                    wait = self.paused_until - now + random.uniform(0, 1)
+                else:
+                    while self.sent and now - self.sent[0][0] >= 60:
+                        self.sent.popleft()
+                    used = sum(sent_tokens for _, sent_tokens in self.sent)
+                    # A request larger than the whole token budget still goes through once the window is empty
+                    if len(self.sent) < int(self.requests_per_minute) and (used + tokens <= self.tokens_per_minute or not self.sent):
+                        self.sent.append((now, tokens))
+                        return
+                    wait = 60 - (now - self.sent[0][0])
+            time.sleep(max(wait, 0.05))
+    
+    def on_success(self):
+        with self.lock:
+            self.requests_per_minute = min(self.max_requests, self.requests_per_minute + 1)
+    
+    def on_rate_limited(self, retry_after: float = 0.0):
+        with self.lock:
+            self.requests_per_minute = max(1.0, self.requests_per_minute / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+    
+    @contextmanager
+    def limit(self, tokens: int):
+        """Wait for budget, then run the request in the with-block and adapt the rate to its outcome."""
+        import anthropic
+        self.acquire(tokens)
+        try:
+            yield
+        except anthropic.RateLimitError as e:
+            self.on_rate_limited(get_retry_after(e.response))
+            raise
+        self.on_success()
 
-def encode_image(uploaded_file) -> str:
-    """Encode uploaded image to base64."""
-    return base64.standard_b64encode(uploaded_file.getvalue()).decode("utf-8")
 
+# Anthropic's default per-model limits for Claude Sonnet; gating on them beats retrying rejected requests
+CLAUDE_REQUESTS_PER_MINUTE = 50
+CLAUDE_TOKENS_PER_MINUTE = 80_000
 
-def parse_ingredients_to_list(raw_text: str) -> list:
-    """Parse the raw ingredients text into a clean list."""
-    ingredients = []
-    lines = raw_text.split('\n')
-    
-    # Words/phrases to skip (not actual ingredients)
-    skip_phrases = [
-        'none visible', 'none', 'n/a', 'aucun', 'aucune', 'pas visible', 
-        'non visible', 'brak', 'nie widoczne', 'żaden', 'nothing', 
-        'not visible', 'empty', 'vide', 'pusto', '(none)', '(aucun)',
-        'none identified', 'aucun identifié', 'nie zidentyfikowano'
-    ]
+
+# Streamlit re-executes this script on every rerun, so process-wide state lives in st.cache_resource
+@st.cache_resource
+def get_claude_limiter() -> RateLimiter:
+    """Return the rate limiter shared by all Claude requests of the process."""
+    return RateLimiter(CLAUDE_REQUESTS_PER_MINUTE, CLAUDE_TOKENS_PER_MINUTE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt text, about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def warm_up_connection(model: str):
+    """Open the AI provider's HTTPS connection in the background so the first request skips the handshake."""
+    client = init_anthropic() if model == "claude" else init_openai()
+    if not client:
+        return
+    
+    def warm_up():
+        try:
+            client.models.list()
+        except Exception:
+            pass  # Best effort: the real request reports any problem
     
-    for line in lines:
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
+# Photos are downscaled and re-encoded before being sent to the vision models
+# Claude scales down images whose long edge exceeds 1568 px, and also any image over about 1.15 megapixels
+# (about 1,600 tokens), so a 4:3 photo at 1568 px is still rescaled server-side.
+# Photos are sent at the size Claude would use, so no upload bytes are spent on pixels it throws away.
+MAX_IMAGE_SIZE = 1568  # longest edge in pixels
+MAX_IMAGE_PIXELS = 1_150_000
+MAX_IMAGE_TOKENS = MAX_IMAGE_PIXELS // 750  # Claude bills about width * height / 750 tokens per image
+JPEG_QUALITY = 85
+
+
+def fit_image_size(width: int, height: int) -> tuple:
+    """Return the size an image is scaled down to so it fits both MAX_IMAGE_SIZE and MAX_IMAGE_PIXELS."""
+    scale = min(1.0, MAX_IMAGE_SIZE / max(width, height), (MAX_IMAGE_PIXELS / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def to_rgb(img: Image.Image) -> Image.Image:
+    """Convert an image to RGB for JPEG, putting transparent areas (cutouts, screenshots) on white.
+    
+    A plain convert("RGB") drops the alpha channel and shows whatever colour is stored under it, often black.
+    """
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        img = img.convert("RGBA")
+        return Image.alpha_composite(Image.new("RGBA", img.size, "white"), img).convert("RGB")
+    return img.convert("RGB")
+
+
+@st.cache_data(max_entries=100, show_spinner=False, hash_funcs={UploadedFile: lambda f: (f.file_id, f.size)})
+def preprocess_image(uploaded_file) -> tuple:
+    """Downscale uploaded image and re-encode it as JPEG, memoized per uploaded file.
+    
+    Returns the image bytes together with their media type. JPEGs that are already small enough
+    and carry no EXIF or XMP metadata (rotation, GPS position, camera details) are passed through
+    untouched; everything else is re-encoded, which also strips that metadata.
+    """
+    data = uploaded_file.getvalue()
+    img = Image.open(io.BytesIO(data))
+    target_size = fit_image_size(*img.size)
+    if img.format == "JPEG" and target_size == img.size and not {"exif", "xmp"} & img.info.keys():
+        return data, "image/jpeg"
+    img.draft("RGB", target_size)  # Let the JPEG decoder skip full resolution
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail(fit_image_size(*img.size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    to_rgb(img).save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+# Gallery thumbnails are shown 70 px wide; twice that keeps them sharp on high-DPI screens
+THUMBNAIL_SIZE = 140
+
+
+@st.cache_data(max_entries=100, show_spinner=False, hash_funcs={UploadedFile: lambda f: (f.file_id, f.size)})
+def make_thumbnail(uploaded_file) -> bytes:
+    """Return a small JPEG of the uploaded image for the photo gallery, memoized per uploaded file."""
+    img = Image.open(io.BytesIO(uploaded_file.getvalue()))
+    img.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))  # Let the JPEG decoder skip full resolution
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    buffer = io.BytesIO()
+    to_rgb(img).save(buffer, "JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def encode_image(image_bytes: bytes) -> str:
+    """Encode prepared image bytes to a base64 string (without an intermediate bytes copy)."""
+    return pybase64.b64encode_as_string(image_bytes)
+
+
+# Signed photo URLs only have to outlive the detection request they are sent with
+SIGNED_URL_EXPIRY = 10 * 60
+
+
+def upload_image_to_storage(supabase: Client, bucket: str, image_hash: str, image_bytes: bytes) -> tuple:
+    """Upload a prepared image to Supabase Storage and return its path and a signed URL.
+    
+    Each upload gets its own path, so deleting it after one detection cannot break another
+    session's request for the same photo. Errors are raised; callers fall back to sending
+    the image inline.
+    """
+    path = f"{image_hash}-{uuid.uuid4().hex}.jpg"
+    storage = supabase.storage.from_(bucket)
+    storage.upload(path, image_bytes, {"content-type": "image/jpeg"})
+    return path, storage.create_signed_url(path, SIGNED_URL_EXPIRY)["signedURL"]
+
+
+def remove_images_from_storage(supabase: Client, bucket: str, paths: list):
+    """Delete uploaded photos once the AI has read them; failures are only logged."""
+    if not paths:
+        return
+    try:
+        supabase.storage.from_(bucket).remove(paths)
+    except Exception as e:
+        logger.warning("Failed to delete uploaded photos: %s", e)
+
+
+# Lines that are not ingredients: list headers and "nothing found" answers, in all supported languages
+INGREDIENT_HEADER_RE = re.compile(r"^(INGREDIENTS|INGRÉDIENTS|SKŁADNIKI|CATEGORIES|CATÉGORIES|KATEGORIE)", re.IGNORECASE)
+LIST_MARKER_RE = re.compile(r"^[-•*–\s]+")  # Any run of leading markers, e.g. "- ", "--" or "* -"
+SKIP_PHRASES = frozenset([
+    'none visible', 'none', 'n/a', 'aucun', 'aucune', 'pas visible',
+    'non visible', 'brak', 'nie widoczne', 'żaden', 'nothing',
+    'not visible', 'empty', 'vide', 'pusto', '(none)', '(aucun)',
+    'none identified', 'aucun identifié', 'nie zidentyfikowano'
+])
+
+
+def iter_ingredients(raw_text: str):
+    """Yield the ingredient names found in the raw model response, in order."""
+    for line in raw_text.split('\n'):
         line = line.strip()
         # Skip empty lines, headers, and category labels
-        if not line:
-            continue
-        if line.upper().startswith(('INGREDIENTS', 'INGRÉDIENTS', 'SKŁADNIKI', 'CATEGORIES', 'CATÉGORIES', 'KATEGORIE')):
+        if not line or INGREDIENT_HEADER_RE.match(line):
             continue
         if line.endswith(':') and len(line) < 50:
             continue
         
         # Remove list markers
-        if line.startswith(('-', '•', '*', '–')):
-            line = line[1:].strip()
+        line = LIST_MARKER_RE.sub('', line)
         
         # Skip lines that look like category headers
-        if ':' in line and len(line.split(':')[0]) < 25:
+        label, colon, after_colon = line.partition(':')
+        if colon and len(label) < 25:
             # This might be "Proteins: chicken, beef" - extract items after colon
-            after_colon = line.split(':', 1)[1].strip()
-            if after_colon and after_colon.lower() not in skip_phrases:
+            after_colon = after_colon.strip()
+            if after_colon and after_colon.lower() not in SKIP_PHRASES:
                 # Split by comma if multiple items
-                items = [item.strip() for item in after_colon.split(',')]
-                for item in items:
-                    if item and len(item) > 1 and item.lower() not in skip_phrases:
-                        ingredients.append(item)
+                for item in after_colon.split(','):
+                    item = item.strip()
+                    if len(item) > 1 and item.lower() not in SKIP_PHRASES:
+                        yield item
             continue
         
         # Skip non-ingredient phrases
-        if line.lower() in skip_phrases:
+        if line.lower() in SKIP_PHRASES:
             continue
         
         # Add valid ingredient
-        if line and len(line) > 1 and not line.startswith(('Photo', '---')):
-            ingredients.append(line)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_ingredients = []
-    for ing in ingredients:
-        ing_lower = ing.lower()
-        if ing_lower not in seen and ing_lower not in skip_phrases:
-            seen.add(ing_lower)
-            unique_ingredients.append(ing)
-    
-    return unique_ingredients
+        if len(line) > 1 and not line.startswith(('Photo', '---')):
+            yield line
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def parse_ingredients_to_list(raw_text: str) -> list:
+    """Parse the raw ingredients text into a clean list."""
+    # Remove duplicates in the same pass, ignoring case and keeping the first spelling
+    unique_ingredients = {}
+    for ing in iter_ingredients(raw_text):
+        unique_ingredients.setdefault(ing.casefold(), ing)
+    return list(unique_ingredients.values())
+
+
+def get_ingredients_prompt(image_count: int, lang: str = "en") -> str:
+    """Return the ingredient prompt, asking for one merged list when several images are sent."""
+    key = "ingredients_prompt_multi" if image_count > 1 else "ingredients_prompt"
+    return load_translations(lang)[key]
 
 
-def get_image_media_type(uploaded_file) -> str:
-    """Get the media type of the uploaded image."""
-    file_type = uploaded_file.type
-    if file_type in ["image/jpeg", "image/png", "image/gif", "image/webp"]:
-        return file_type
-    return "image/jpeg"
+@contextmanager
+def claude_errors():
+    """Re-raise errors from a Claude request as exceptions with a user-facing message."""
+    import anthropic
+    try:
+        yield
+    except anthropic.APIStatusError as e:
+        # Overloaded (529/503) and rate limit (429) errors reach here once the client's retries are used up
+        if e.status_code in [529, 503]:  # Overloaded or service unavailable
+            raise Exception("The AI service is currently busy. Please try again in a few moments.")
+        elif e.status_code == 429:  # Rate limit
+            raise Exception("Rate limit reached. Please wait a minute before trying again.")
+        else:
+            raise Exception(f"API error ({e.status_code}): {str(e)}")
+    except anthropic.APIConnectionError:
+        raise Exception("Could not connect to AI service. Please check your internet connection.")
+    except Exception as e:
+        raise Exception(f"Unexpected error: {str(e)}")
 
 
-def identify_ingredients_claude(client, image_data: str, media_type: str, lang: str = "en") -> dict:
-    """Use Claude to identify ingredients from an image with retry logic."""
+@contextmanager
+def openai_errors():
+    """Re-raise errors from an OpenAI request as exceptions with a user-facing message."""
+    import openai
+    try:
+        yield
+    except openai.RateLimitError:
+        raise Exception("Rate limit reached. Please wait a minute before trying again.")
+    except openai.APIConnectionError:
+        raise Exception("Could not connect to AI service. Please check your internet connection.")
+    except Exception as e:
+        raise Exception(f"Unexpected error: {str(e)}")
+
+
+def log_claude_usage(message):
+    """Log the token usage of a Claude response, including prompt cache reads."""
+    usage = message.usage
+    logger.info(
+        "Claude usage: %s input, %s output, %s cache read tokens",
+        usage.input_tokens, usage.output_tokens, usage.cache_read_input_tokens or 0,
+    )
+
+
+def identify_ingredients_claude(client, images: list, prompt: str) -> dict:
+    """Use Claude to identify ingredients from one or more images in a single request.
     
-    max_retries = 3
-    retry_delay = 2  # seconds
-    prompt = TRANSLATIONS[lang]["ingredients_prompt"]
+    images is a list of (image_data, media_type, image_url) tuples. Each image is sent
+    by URL when image_url is given, otherwise inline as base64.
+    """
     
-    for attempt in range(max_retries):
-        try:
-            message = client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=1024,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": image_data,
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ],
-                    }
-                ],
-            )
-            return {"raw_response": message.content[0].text}
-        
-        except anthropic.APIStatusError as e:
-            # Handle overloaded (529) and rate limit (429) errors
-            if e.status_code in [529, 503]:  # Overloaded or service unavailable
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    raise Exception("The AI service is currently busy. Please try again in a few moments.")
-            elif e.status_code == 429:  # Rate limit
-                raise Exception("Rate limit reached. Please wait a minute before trying again.")
-            else:
-                raise Exception(f"API error ({e.status_code}): {str(e)}")
-        except anthropic.APIConnectionError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Could not connect to AI service. Please check your internet connection.")
-        except Exception as e:
-            raise Exception(f"Unexpected error: {str(e)}")
+    content = []
+    for image_data, media_type, image_url in images:
+        if image_url:
+            source = {"type": "url", "url": image_url}
+        else:
+            source = {"type": "base64", "media_type": media_type, "data": image_data}
+        content.append({"type": "image", "source": source})
+    
+    # Claude bills an image at about width * height / 750 tokens
+    # Prepared photos fit MAX_IMAGE_PIXELS, so none costs more than MAX_IMAGE_TOKENS
+    estimated_tokens = estimate_tokens(prompt) + len(images) * MAX_IMAGE_TOKENS
+    with claude_errors(), get_claude_limiter().limit(estimated_tokens):
+        # The instructions go in the system prompt, ahead of the per-request images. They are not marked
+        # for prompt caching: Claude Sonnet only caches prefixes of 1024 tokens or more, and they are far shorter.
+        message = client.messages.create(
+            model="claude-sonnet-4-5-20250929",
+            max_tokens=1024,
+            system=prompt,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content,
+                }
+            ],
+        )
+        log_claude_usage(message)
+        return {"raw_response": message.content[0].text}
 
 
-def identify_ingredients_openai(client, image_data: str, media_type: str, model: str, lang: str = "en") -> dict:
-    """Use OpenAI to identify ingredients from an image with retry logic."""
+def identify_ingredients_openai(client, images: list, model: str, prompt: str) -> dict:
+    """Use OpenAI to identify ingredients from one or more images in a single request.
     
-    max_retries = 3
-    retry_delay = 2
-    prompt = TRANSLATIONS[lang]["ingredients_prompt"]
+    images is a list of (image_data, media_type, image_url) tuples. Each image is sent
+    by URL when image_url is given, otherwise inline as a data URL.
+    """
     
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                max_tokens=1024,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{media_type};base64,{image_data}"
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ],
-                    }
-                ],
-            )
-            return {"raw_response": response.choices[0].message.content}
+    content = [
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": image_url or f"data:{media_type};base64,{image_data}"
+            }
+        }
+        for image_data, media_type, image_url in images
+    ]
+    content.append({"type": "text", "text": prompt})
+    
+    with openai_errors():
+        response = client.chat.completions.create(
+            model=model,
+            max_tokens=1024,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content,
+                }
+            ],
+        )
+        return {"raw_response": response.choices[0].message.content}
+
+
+def get_image_hash(uploaded_file) -> str:
+    """Hash the uploaded image bytes, used as the ingredient cache key."""
+    return hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).hexdigest()
+
+
+# Photos whose difference hashes differ in at most this many bits are treated as the same shot
+NEAR_DUPLICATE_DISTANCE = 4
+
+
+@st.cache_data(max_entries=100, show_spinner=False, hash_funcs={UploadedFile: lambda f: (f.file_id, f.size)})
+def get_image_dhash(uploaded_file) -> int:
+    """Compute a 64-bit difference hash (dHash) of the image to spot near-duplicate photos, memoized per uploaded file."""
+    img = Image.open(io.BytesIO(uploaded_file.getvalue()))
+    img.draft("L", (64, 64))  # Let the JPEG decoder skip full resolution
+    pixels = img.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    dhash = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            dhash = (dhash << 1) | (left > right)
+    return dhash
+
+
+def find_near_duplicate(dhash: int, known):
+    """Return the first of the known hashes within NEAR_DUPLICATE_DISTANCE bits of dhash, if any."""
+    for known_hash in known:
+        if bin(dhash ^ known_hash).count("1") <= NEAR_DUPLICATE_DISTANCE:
+            return known_hash
+    return None
+
+
+# Upper bound on photos sent together in one detection request; larger uploads are split
+MAX_IMAGES_PER_REQUEST = 10
+
+# Photos remembered per model and language for reuse within a session, least recently used dropped first
+MAX_REMEMBERED_PHOTOS = 32
+
+# Upper bound on detection requests in flight at once, shared by all sessions of this process;
+# matches the concurrent-request allowance of the entry API usage tiers
+MAX_CONCURRENT_REQUESTS = 5
+
+
+@st.cache_resource
+def get_detection_slots() -> threading.Semaphore:
+    """Return the semaphore bounding detection requests in flight across the process."""
+    return threading.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+
+# Photos decoded, resized and uploaded at once across the process; each one holds a full-size photo in memory
+MAX_CONCURRENT_PREPARES = 4
+
+
+@st.cache_resource
+def get_prepare_executor() -> ThreadPoolExecutor:
+    """Return the thread pool that prepares photos for detection, shared by all sessions of the process."""
+    return ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PREPARES, thread_name_prefix="prepare-image")
+
+
+@st.cache_data(ttl=24 * 60 * 60, max_entries=500, show_spinner=False)
+def identify_ingredients_cached(image_hashes: tuple, _uploaded_files: list, model: str, lang: str = "en") -> str:
+    """Identify ingredients across a batch of images in one request, cached on the image hashes.
+    
+    When SUPABASE_IMAGE_BUCKET is configured the photos are uploaded there, sent by URL and
+    deleted again once the request is done.
+    """
+    bucket = get_secret("SUPABASE_IMAGE_BUCKET")
+    supabase = init_supabase() if bucket else None
+    uploaded_paths = []
+    
+    def prepare(image_hash: str, uploaded_file) -> tuple:
+        image_bytes, media_type = preprocess_image(uploaded_file)
+        image_url = None
+        if supabase:
+            try:
+                path, image_url = upload_image_to_storage(supabase, bucket, image_hash, image_bytes)
+                uploaded_paths.append(path)
+            except Exception:
+                pass  # Fall back to sending the image inline
+        image_data = None if image_url else encode_image(image_bytes)
+        return image_data, media_type, image_url
+    
+    try:
+        # Resizing and uploading are independent per photo, so they overlap on the shared, bounded pool
+        images = list(get_prepare_executor().map(prepare, image_hashes, _uploaded_files))
         
-        except openai.RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Rate limit reached. Please wait a minute before trying again.")
-        except openai.APIConnectionError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Could not connect to AI service. Please check your internet connection.")
-        except Exception as e:
-            raise Exception(f"Unexpected error: {str(e)}")
+        prompt = get_ingredients_prompt(len(images), lang)
+        if model == "claude":
+            result = identify_ingredients_claude(init_anthropic(), images, prompt)
+        else:
+            result = identify_ingredients_openai(init_openai(), images, model, prompt)
+        return result["raw_response"]
+    finally:
+        remove_images_from_storage(supabase, bucket, uploaded_paths)
 
 
-def get_recipe_prompt(ingredients: str, preferences_text: str, lang: str, kids_mode: bool = False) -> str:
-    """Generate the recipe suggestion prompt."""
-    lang_instructions = {
-        "en": "Respond in English.",
-        "fr": "Réponds en français.",
-        "pl": "Odpowiedz po polsku."
-    }
+def identify_batch(image_hashes: tuple, uploaded_files: list, model: str, lang: str = "en") -> str:
+    """Run one batch detection once a request slot is free."""
+    with get_detection_slots():
+        return identify_ingredients_cached(image_hashes, uploaded_files, model, lang)
+
+
+def identify_all_ingredients(images: list, model: str, lang: str = "en", on_progress=None) -> list:
+    """Identify ingredients in batches of MAX_IMAGES_PER_REQUEST images, running the batches in parallel.
     
-    kids_instructions = {
-        "en": """
+    on_progress(done, total) is called from the calling thread as batches finish.
+    """
+    batches = [images[i:i + MAX_IMAGES_PER_REQUEST] for i in range(0, len(images), MAX_IMAGES_PER_REQUEST)]
+    responses = [None] * len(batches)
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(batches))) as executor:
+        futures = {
+            executor.submit(identify_batch, tuple(get_image_hash(img) for img in batch), batch, model, lang): i
+            for i, batch in enumerate(batches)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            responses[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(batches))
+    return responses
+
+
+def detect_ingredients(images: list, model: str, lang: str = "en", on_progress=None) -> list:
+    """Identify ingredients across the images, sending only photos that are not near-duplicates.
+    
+    A photo close to one analyzed earlier in this session reuses that response, as long as every
+    photo of the earlier request is still part of the upload (the response lists all of them).
+    Near-duplicates within the upload are only sent once. Returns the raw responses to combine.
+    """
+    known = st.session_state.setdefault('ingredients_by_dhash', {}).setdefault((model, lang), {})
+    dhashes = [get_image_dhash(img) for img in images]
+    results = []
+    pending = {}
+    for img, dhash in zip(images, dhashes):
+        match = find_near_duplicate(dhash, known)
+        if match is not None:
+            response, batch = known.pop(match)
+            known[match] = (response, batch)  # Mark as recently used
+            if all(find_near_duplicate(other, dhashes) is not None for other in batch):
+                if response not in results:
+                    results.append(response)
+                continue
+        if find_near_duplicate(dhash, pending) is None:
+            pending[dhash] = img
+    
+    if pending:
+        responses = identify_all_ingredients(list(pending.values()), model, lang, on_progress)
+        pending_hashes = list(pending)
+        for i, dhash in enumerate(pending_hashes):
+            batch_start = i - i % MAX_IMAGES_PER_REQUEST
+            batch = tuple(pending_hashes[batch_start:batch_start + MAX_IMAGES_PER_REQUEST])
+            known.pop(dhash, None)
+            known[dhash] = (responses[i // MAX_IMAGES_PER_REQUEST], batch)
+        results.extend(responses)
+    
+    while len(known) > MAX_REMEMBERED_PHOTOS:
+        del known[next(iter(known))]
+    return results
+
+
+# Recipe prompt pieces, built once at import; get_recipe_prompt only fills in the dynamic parts
+RECIPE_LANGUAGE_INSTRUCTIONS = {
+    "en": "Respond in English.",
+    "fr": "Réponds en français.",
+    "pl": "Odpowiedz po polsku."
+}
+
+KIDS_MODE_INSTRUCTIONS = {
+    "en": """
 IMPORTANT - KIDS MODE ENABLED:
 - Recipes must be VERY EASY and safe for children aged 6-12 to help prepare
 - Avoid sharp knives, hot oil, raw meat handling
@@ -1098,7 +985,7 @@ IMPORTANT - KIDS MODE ENABLED:
 - Include simple tasks kids can do: mixing, pouring, decorating
 - Prefer familiar flavors that children typically enjoy
 - Keep instructions simple and clear""",
-        "fr": """
+    "fr": """
 IMPORTANT - MODE ENFANTS ACTIVÉ:
 - Les recettes doivent être TRÈS FACILES et sûres pour des enfants de 6-12 ans
 - Éviter les couteaux tranchants, l'huile chaude, la manipulation de viande crue
@@ -1107,7 +994,7 @@ IMPORTANT - MODE ENFANTS ACTIVÉ:
 - Inclure des tâches simples pour enfants: mélanger, verser, décorer
 - Préférer les saveurs familières que les enfants aiment
 - Instructions simples et claires""",
-        "pl": """
+    "pl": """
 WAŻNE - TRYB DLA DZIECI WŁĄCZONY:
 - Przepisy muszą być BARDZO ŁATWE i bezpieczne dla dzieci w wieku 6-12 lat
 - Unikać ostrych noży, gorącego oleju, surowego mięsa
@@ -1116,24 +1003,23 @@ WAŻNE - TRYB DLA DZIECI WŁĄCZONY:
 - Dołączyć proste zadania dla dzieci: mieszanie, nalewanie, dekorowanie
 - Preferować znajome smaki, które dzieci lubią
 - Instrukcje proste i jasne"""
-    }
-    
-    kids_text = kids_instructions.get(lang, kids_instructions["en"]) if kids_mode else ""
-    
-    return f"""Based on these available ingredients:
+}
+
+RECIPE_PROMPT_TEMPLATE = """Based on these available ingredients:
 
 {ingredients}
-{preferences_text}
-{kids_text}
+{preferences}
+{kids}
 
 Suggest 3 recipes that can be made primarily with these ingredients.
 
-{lang_instructions.get(lang, lang_instructions["en"])}
+{language}"""
 
-IMPORTANT: Return your response as a valid JSON object with this exact structure:
-{{
+# Static output instructions, sent as the system prompt ahead of the per-request prompt
+RECIPE_SYSTEM_PROMPT = """IMPORTANT: Return your response as a valid JSON object with this exact structure:
+{
     "recipes": [
-        {{
+        {
             "name": "Recipe Name Here",
             "difficulty": "Easy/Medium/Hard",
             "time": "30 minutes",
@@ -1141,9 +1027,9 @@ IMPORTANT: Return your response as a valid JSON object with this exact structure
             "missing_ingredients": ["ingredient that is NOT in the available list"],
             "instructions": ["Step 1 description", "Step 2 description", "Step 3 description"],
             "tip": "Pro tip for this dish"
-        }}
+        }
     ]
-}}
+}
 
 Make sure to:
 - Include exactly 3 recipes
@@ -1153,6 +1039,39 @@ Make sure to:
 - Return ONLY the JSON, no other text before or after"""
 
 
+# Translation keys of the "no preference" cuisine choice; picking it adds no cuisine preference
+ANY_CUISINE_KEYS = ("cuisine_all", "cuisine_any")
+
+
+@st.cache_resource
+def get_any_cuisine_labels() -> frozenset:
+    """Return the "no preference" cuisine labels of every language, read from the translation files."""
+    langs = [name[:-len(".json")] for name in os.listdir(TRANSLATIONS_DIR) if name.endswith(".json")]
+    return frozenset(load_translations(lang)[key] for lang in langs for key in ANY_CUISINE_KEYS)
+
+
+def get_preferences_text(dietary_preferences: list = None, cuisine_preference: str = None) -> str:
+    """Build the preferences lines of the recipe prompt."""
+    lines = []
+    if dietary_preferences:
+        lines.append(f"Dietary requirements: {', '.join(dietary_preferences)}")
+    if cuisine_preference and cuisine_preference not in get_any_cuisine_labels():
+        lines.append(f"Preferred cuisine: {cuisine_preference}")
+    return "".join(f"\n{line}" for line in lines)
+
+
+def get_recipe_prompt(ingredients: str, preferences_text: str, lang: str, kids_mode: bool = False) -> str:
+    """Generate the recipe suggestion prompt."""
+    kids_text = KIDS_MODE_INSTRUCTIONS.get(lang, KIDS_MODE_INSTRUCTIONS["en"]) if kids_mode else ""
+    
+    return RECIPE_PROMPT_TEMPLATE.format(
+        ingredients=ingredients,
+        preferences=preferences_text,
+        kids=kids_text,
+        language=RECIPE_LANGUAGE_INSTRUCTIONS.get(lang, RECIPE_LANGUAGE_INSTRUCTIONS["en"])
+    )
+
+
 def parse_recipe_response(response_text: str) -> dict:
     """Parse the JSON response from the AI model."""
     # Clean up response if needed (remove markdown code blocks if present)
@@ -1166,162 +1085,375 @@ def parse_recipe_response(response_text: str) -> dict:
     cleaned = cleaned.strip()
     
     try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError as e:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError as e:
         return {"raw_text": response_text, "parse_error": str(e)}
 
 
-def suggest_recipes_claude(client, ingredients: str, dietary_preferences: list = None, cuisine_preference: str = None, lang: str = "en", kids_mode: bool = False) -> dict:
+# Matches each complete "name" field of the recipe JSON while it is still being streamed
+RECIPE_NAME_RE = re.compile(r'"name"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def unescape_json_string(raw: str) -> str:
+    """Decode the escapes (\\", \\u00e9, \\/) in the body of a JSON string, or return it as is if they are malformed."""
+    try:
+        return orjson.loads(f'"{raw}"')
+    except orjson.JSONDecodeError:
+        return raw
+
+
+# Typical length of a three-recipe JSON response, used to estimate streaming progress
+EXPECTED_RECIPE_RESPONSE_CHARS = 6000
+
+
+def make_recipe_stream_preview(placeholder, on_progress=None):
+    """Return an on_text callback that lists recipe names in `placeholder` as they are streamed.
+    
+    on_progress(fraction) is called with the estimated share of the response received so far,
+    whenever it grows by at least a percent.
+    """
+    names = []
+    pending = ""  # Streamed text that may still contain the start of a "name" field
+    received_chars = 0
+    reported_percent = 0
+
+    def on_text(text: str):
+        nonlocal pending, received_chars, reported_percent
+        pending += text
+        found = len(names)
+        scanned = 0
+        for match in RECIPE_NAME_RE.finditer(pending):
+            names.append(unescape_json_string(match.group(1)))
+            scanned = match.end()
+        pending = pending[scanned:]
+        # Keep only the last, possibly unfinished, "name" field (or what could become its key),
+        # so each delta scans a few characters instead of the whole response
+        start = pending.rfind('"name"')
+        pending = pending[start:] if start >= 0 else pending[-(len('"name"') - 1):]
+        if len(names) > found:
+            placeholder.markdown("\n".join(f"{i}. {get_recipe_emojis(name)} {name}" for i, name in enumerate(names, 1)))
+        if on_progress:
+            received_chars += len(text)
+            percent = min(100, received_chars * 100 // EXPECTED_RECIPE_RESPONSE_CHARS)
+            if percent > reported_percent:
+                reported_percent = percent
+                on_progress(percent / 100)
+
+    return on_text
+
+
+def suggest_recipes_claude(client, ingredients: str, dietary_preferences: list = None, cuisine_preference: str = None, lang: str = "en", kids_mode: bool = False, on_text=None) -> dict:
     """Use Claude to suggest recipes based on identified ingredients."""
     
-    preferences_text = ""
-    if dietary_preferences:
-        preferences_text += f"\nDietary requirements: {', '.join(dietary_preferences)}"
-    if cuisine_preference and cuisine_preference != "Any" and cuisine_preference != "Toutes" and cuisine_preference != "Dowolna":
-        preferences_text += f"\nPreferred cuisine: {cuisine_preference}"
+    preferences_text = get_preferences_text(dietary_preferences, cuisine_preference)
     
-    max_retries = 3
-    retry_delay = 2
     prompt = get_recipe_prompt(ingredients, preferences_text, lang, kids_mode)
 
-    for attempt in range(max_retries):
-        try:
-            message = client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=3000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-            )
-            
-            return parse_recipe_response(message.content[0].text)
+    with claude_errors(), get_claude_limiter().limit(estimate_tokens(RECIPE_SYSTEM_PROMPT + prompt)):
+        with client.messages.stream(
+            model="claude-sonnet-4-5-20250929",
+            max_tokens=3000,
+            system=RECIPE_SYSTEM_PROMPT,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+        ) as stream:
+            for text in stream.text_stream:
+                if on_text:
+                    on_text(text)
+            message = stream.get_final_message()
+        log_claude_usage(message)
         
-        except anthropic.APIStatusError as e:
-            if e.status_code in [529, 503]:
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    raise Exception("The AI service is currently busy. Please try again in a few moments.")
-            elif e.status_code == 429:
-                raise Exception("Rate limit reached. Please wait a minute before trying again.")
-            else:
-                raise Exception(f"API error ({e.status_code}): {str(e)}")
-        except anthropic.APIConnectionError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Could not connect to AI service. Please check your internet connection.")
-        except Exception as e:
-            if "JSON" in str(e) or "json" in str(e):
-                raise Exception(f"Failed to parse recipe data: {str(e)}")
-            raise Exception(f"Unexpected error: {str(e)}")
+        return parse_recipe_response(message.content[0].text)
 
 
-def suggest_recipes_openai(client, model: str, ingredients: str, dietary_preferences: list = None, cuisine_preference: str = None, lang: str = "en", kids_mode: bool = False) -> dict:
+def suggest_recipes_openai(client, model: str, ingredients: str, dietary_preferences: list = None, cuisine_preference: str = None, lang: str = "en", kids_mode: bool = False, on_text=None) -> dict:
     """Use OpenAI to suggest recipes based on identified ingredients."""
     
-    preferences_text = ""
-    if dietary_preferences:
-        preferences_text += f"\nDietary requirements: {', '.join(dietary_preferences)}"
-    if cuisine_preference and cuisine_preference != "Any" and cuisine_preference != "Toutes" and cuisine_preference != "Dowolna":
-        preferences_text += f"\nPreferred cuisine: {cuisine_preference}"
+    preferences_text = get_preferences_text(dietary_preferences, cuisine_preference)
     
-    max_retries = 3
-    retry_delay = 2
     prompt = get_recipe_prompt(ingredients, preferences_text, lang, kids_mode)
 
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                max_tokens=3000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-            )
-            
-            return parse_recipe_response(response.choices[0].message.content)
+    with openai_errors():
+        stream = client.chat.completions.create(
+            model=model,
+            max_tokens=3000,
+            messages=[
+                {
+                    "role": "system",
+                    "content": RECIPE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            stream=True,
+        )
         
-        except openai.RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Rate limit reached. Please wait a minute before trying again.")
-        except openai.APIConnectionError:
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                raise Exception("Could not connect to AI service. Please check your internet connection.")
-        except Exception as e:
-            if "JSON" in str(e) or "json" in str(e):
-                raise Exception(f"Failed to parse recipe data: {str(e)}")
-            raise Exception(f"Unexpected error: {str(e)}")
+        chunks = []
+        for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                chunks.append(text)
+                if on_text:
+                    on_text(text)
+        
+        return parse_recipe_response("".join(chunks))
+
+
+def suggest_recipes(model: str, ingredients: str, dietary_preferences: list = None, cuisine_preference: str = None, lang: str = "en", kids_mode: bool = False, on_text=None) -> dict:
+    """Suggest recipes with the selected model, reusing the result of identical requests in this session."""
+    cache = st.session_state.setdefault('recipe_cache', {})
+    key = (model, ingredients, tuple(dietary_preferences or ()), cuisine_preference, lang, kids_mode)
+    if key in cache:
+        return cache[key]
+    
+    if model == "claude":
+        recipes = suggest_recipes_claude(init_anthropic(), ingredients, dietary_preferences, cuisine_preference, lang, kids_mode, on_text=on_text)
+    else:
+        recipes = suggest_recipes_openai(init_openai(), model, ingredients, dietary_preferences, cuisine_preference, lang, kids_mode, on_text=on_text)
+    
+    # Only keep well-formed results so a parse failure can be retried
+    if "recipes" in recipes:
+        cache[key] = recipes
+    return recipes
+
+
+def build_history_row(ingredients: str, recipes_data) -> dict:
+    """Build the recipe_searches row for one search."""
+    # Handle both structured and raw data
+    if isinstance(recipes_data, dict) and "recipes" in recipes_data:
+        # Extract recipe names for easy display in history
+        recipe_names = [r.get("name", "Unknown") for r in recipes_data.get("recipes", [])]
+        recipes_json = orjson.dumps(recipes_data).decode("utf-8")
+        recipes_text = ", ".join(recipe_names)
+    elif isinstance(recipes_data, dict) and "raw_text" in recipes_data:
+        recipes_json = orjson.dumps(recipes_data).decode("utf-8")
+        recipes_text = recipes_data.get("raw_text", "")[:500]
+    else:
+        recipes_json = None
+        recipes_text = str(recipes_data)
+    
+    return {
+        "id": str(uuid.uuid4()),
+        "ingredients_detected": ingredients,
+        "recipes_suggested": recipes_text,
+        "recipes_json": recipes_json,
+        "created_at": datetime.now().isoformat()
+    }
+
+
+# PostgREST and Postgres error codes for a column the table does not have (databases without recipes_json)
+MISSING_COLUMN_CODES = frozenset({"PGRST204", "42703"})
 
 
-def save_to_supabase(supabase: Client, ingredients: str, recipes_data):
-    """Save the search to Supabase for history."""
+def insert_history_rows(supabase: Client, rows: list):
+    """Insert history rows, skipping any whose id is already stored.
+    
+    Rows carry their own id, so retrying a batch whose earlier insert did commit (a timed-out
+    response) adds no duplicate searches.
+    """
+    supabase.table("recipe_searches").upsert(rows, on_conflict="id", ignore_duplicates=True).execute()
+
+
+def save_to_supabase(supabase: Client, rows: list, errors: list = None):
+    """Save searches to Supabase for history with a single bulk insert.
+    
+    Runs on a background thread, which cannot draw on the page; failures are logged and
+    appended to `errors` so the next run can show them.
+    """
 
     try:
-        # Handle both structured and raw data
-        if isinstance(recipes_data, dict) and "recipes" in recipes_data:
-            # Extract recipe names for easy display in history
-            recipe_names = [r.get("name", "Unknown") for r in recipes_data.get("recipes", [])]
-            recipes_json = json.dumps(recipes_data, ensure_ascii=False)
-            recipes_text = ", ".join(recipe_names)
-        elif isinstance(recipes_data, dict) and "raw_text" in recipes_data:
-            recipes_json = json.dumps(recipes_data, ensure_ascii=False)
-            recipes_text = recipes_data.get("raw_text", "")[:500]
-        else:
-            recipes_json = None
-            recipes_text = str(recipes_data)
-        
-        data = {
-            "ingredients_detected": ingredients,
-            "recipes_suggested": recipes_text,
-            "recipes_json": recipes_json,
-            "created_at": datetime.now().isoformat()
-        }
-        supabase.table("recipe_searches").insert(data).execute()
+        try:
+            insert_history_rows(supabase, rows)
+        except Exception as e:
+            # Only a missing recipes_json column is worked around here; every other error is left to the caller's retries
+            if getattr(e, "code", None) not in MISSING_COLUMN_CODES:
+                raise
+            insert_history_rows(supabase, [{k: v for k, v in row.items() if k != "recipes_json"} for row in rows])
         return True
     except Exception as e:
-        # If recipes_json column doesn't exist, try without it
+        logger.error("Failed to save to database: %s", e)
+        if errors is not None:
+            errors.append(str(e))
+        return False
+
+
+# Number of recent searches fetched for the sidebar
+HISTORY_LIMIT = 10
+
+# Failed history inserts are retried after 1 s and 2 s before the error is reported
+HISTORY_SAVE_ATTEMPTS = 3
+
+
+class HistoryWriter:
+    """Queue of searches waiting to be saved, drained in bulk by one background thread at a time.
+    
+    Searches finished while an insert is in flight are written together in the next insert.
+    """
+    
+    def __init__(self):
+        self.pending = []  # (row, errors list) pairs
+        self.lock = threading.Lock()
+        self.running = False
+    
+    def queue(self, supabase: Client, ingredients: str, recipes_data, errors: list):
+        """Queue a search for saving and make sure the background writer is running."""
+        with self.lock:
+            self.pending.append((build_history_row(ingredients, recipes_data), errors))
+            if self.running:
+                return
+            self.running = True
+        threading.Thread(target=self.write_pending, args=(supabase,), daemon=True).start()
+    
+    def write_pending(self, supabase: Client):
+        """Insert queued searches in bulk until the queue is empty."""
+        while True:
+            with self.lock:
+                batch = self.pending[:]
+                self.pending.clear()
+                if not batch:
+                    self.running = False
+                    return
+            rows = [row for row, _ in batch]
+            batch_errors = []
+            for attempt in range(HISTORY_SAVE_ATTEMPTS):
+                last_attempt = attempt == HISTORY_SAVE_ATTEMPTS - 1
+                if save_to_supabase(supabase, rows, batch_errors if last_attempt else None):
+                    self.refresh_history(supabase)
+                    break
+                if not last_attempt:
+                    time.sleep(2 ** attempt)
+            for _, errors in batch:
+                errors.extend(batch_errors)
+    
+    def refresh_history(self, supabase: Client):
+        """Replace the cached history with one that lists the new searches.
+        
+        Fetching it here, off the script thread, means the next "Load Recent" is served from the cache.
+        """
+        fetch_search_history.clear()
         try:
-            data = {
-                "ingredients_detected": ingredients,
-                "recipes_suggested": recipes_text if 'recipes_text' in dir() else str(recipes_data),
-                "created_at": datetime.now().isoformat()
-            }
-            supabase.table("recipe_searches").insert(data).execute()
-            return True
-        except Exception as e2:
-            st.error(f"Failed to save to database: {e2}")
-            return False
+            fetch_search_history(supabase, HISTORY_LIMIT)
+        except Exception as e:
+            logger.warning("Failed to refresh search history: %s", e)
+
+
+@st.cache_resource
+def get_history_writer() -> HistoryWriter:
+    """Return the history writer shared by all sessions of the process."""
+    return HistoryWriter()
 
 
-def load_search_history(supabase: Client, limit: int = 10):
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_search_history(_supabase: Client, limit: int = HISTORY_LIMIT) -> list:
+    """Fetch recent searches (only the columns shown in the sidebar), cached for a minute."""
+    response = _supabase.table("recipe_searches")\
+        .select("created_at, ingredients_detected")\
+        .order("created_at", desc=True)\
+        .limit(limit)\
+        .execute()
+    return response.data
+
+
+def load_search_history(supabase: Client, limit: int = HISTORY_LIMIT):
     """Load recent search history from Supabase."""
     try:
-        response = supabase.table("recipe_searches")\
-            .select("*")\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .execute()
-        return response.data
+        return fetch_search_history(supabase, limit)
     except Exception as e:
         st.error(f"Failed to load history: {e}")
         return []
 
 
+def set_language(lang: str):
+    """Language button callback; runs before the rerun, so the page renders once in the new language."""
+    st.session_state.language = lang
+
+
+def add_image(uploaded_file):
+    """Add a camera or uploaded photo to the gallery, unless the same file or picture was added before.
+    
+    Files stay "seen" after being removed, so the camera and uploader, which keep returning
+    their files on every run, don't put them back.
+    """
+    seen_ids = st.session_state.setdefault('seen_image_ids', set())
+    if uploaded_file.file_id in seen_ids:
+        return
+    seen_ids.add(uploaded_file.file_id)
+    image_hashes = st.session_state.setdefault('image_hashes', set())
+    image_hash = get_image_hash(uploaded_file)
+    if image_hash not in image_hashes:
+        image_hashes.add(image_hash)
+        st.session_state.images.append(uploaded_file)
+
+
+def remove_image(idx: int):
+    """Thumbnail ✕ callback.
+    
+    The file id stays seen so the widgets don't put the photo back, but the picture itself
+    can be added again, e.g. by uploading the same file once more.
+    """
+    img = st.session_state.images.pop(idx)
+    st.session_state.setdefault('image_hashes', set()).discard(get_image_hash(img))
+
+
+def select_recipe(idx: int):
+    """Recipe card callback."""
+    st.session_state['selected_recipe_idx'] = idx
+
+
+def clear_search():
+    """Clear photos / New search callback: drop the photos and everything derived from them."""
+    st.session_state.images = []
+    for key in ('detected_ingredients', 'ingredients_list', 'ingredients', 'recipes',
+                'selected_recipe_idx', 'ingredients_modified', 'seen_image_ids', 'image_hashes'):
+        st.session_state.pop(key, None)
+    # New widget keys give an empty camera and uploader, so the old photos are not added again
+    st.session_state['photo_inputs_version'] = st.session_state.get('photo_inputs_version', 0) + 1
+
+
+@st.fragment
+def show_recipe_cards(recipe_list: list, lang: str):
+    """Recipe cards and the selected recipe's details.
+    
+    Runs as a fragment, so picking another card reruns only this part of the page.
+    """
+    cols = st.columns(len(recipe_list))
+    for idx, recipe in enumerate(recipe_list):
+        with cols[idx]:
+            name = recipe.get("name", f"Recipe {idx + 1}")
+            emojis = get_recipe_emojis(name)
+            is_selected = (idx == st.session_state['selected_recipe_idx'])
+            
+            # Card as clickable button
+            st.button(
+                f"{emojis}",
+                key=f"recipe_card_{idx}",
+                use_container_width=True,
+                type="primary" if is_selected else "secondary",
+                on_click=select_recipe,
+                args=(idx,)
+            )
+            
+            # Recipe name below button
+            text_style = "font-weight: 700;" if is_selected else "font-weight: 500;"
+            st.markdown(f"<p style='text-align: center; font-size: 0.85rem; {text_style} margin-top: -10px;'>{name}</p>", unsafe_allow_html=True)
+    
+    # Custom CSS for recipe cards
+    st.markdown(get_style_tag("recipe_cards.css"), unsafe_allow_html=True)
+    
+    # Show only selected recipe details
+    st.markdown("---")
+    selected_idx = st.session_state['selected_recipe_idx']
+    if selected_idx < len(recipe_list):
+        selected_recipe = recipe_list[selected_idx]
+        st.markdown(format_recipe_for_display(selected_recipe, selected_idx + 1, lang))
+
+
 def main():
     # Initialize language in session state
     if 'language' not in st.session_state:
@@ -1334,36 +1466,27 @@ def main():
         st.markdown(f'<h1 class="main-header" style="margin-bottom: 0;">{get_text("title")}</h1>', unsafe_allow_html=True)
     
     with header_col2:
-        # Custom CSS for language buttons
-        st.markdown("""
-        <style>
-        [data-testid="stHorizontalBlock"]:has(button[key*="lang"]) {
-            align-items: center;
-        }
-        </style>
-        """, unsafe_allow_html=True)
         lang_cols = st.columns(3)
         with lang_cols[0]:
             en_type = "primary" if st.session_state.language == 'en' else "secondary"
-            if st.button("EN", use_container_width=True, type=en_type, key="lang_en"):
-                st.session_state.language = 'en'
-                st.rerun()
+            st.button("EN", use_container_width=True, type=en_type, key="lang_en", on_click=set_language, args=('en',))
         with lang_cols[1]:
             fr_type = "primary" if st.session_state.language == 'fr' else "secondary"
-            if st.button("FR", use_container_width=True, type=fr_type, key="lang_fr"):
-                st.session_state.language = 'fr'
-                st.rerun()
+            st.button("FR", use_container_width=True, type=fr_type, key="lang_fr", on_click=set_language, args=('fr',))
         with lang_cols[2]:
             pl_type = "primary" if st.session_state.language == 'pl' else "secondary"
-            if st.button("PL", use_container_width=True, type=pl_type, key="lang_pl"):
-                st.session_state.language = 'pl'
-                st.rerun()
+            st.button("PL", use_container_width=True, type=pl_type, key="lang_pl", on_click=set_language, args=('pl',))
     
     # Initialize clients
     anthropic_client = init_anthropic()
     openai_client = init_openai()
     supabase_client = init_supabase()
     
+    # Report history saves that failed in the background since the last run
+    save_errors = st.session_state.get('save_errors')
+    while save_errors:
+        st.error(f"Failed to save to database: {save_errors.pop(0)}")
+    
     # Check for at least one API key
     if not anthropic_client and not openai_client:
         st.error(get_text("error_api_key"))
@@ -1420,6 +1543,7 @@ def main():
         st.session_state.images = []
     
     # Camera and upload in tabs (compact)
+    photo_inputs_version = st.session_state.get('photo_inputs_version', 0)
     tab_camera, tab_upload = st.tabs([get_text("take_photo"), get_text("upload_image")])
     
     with tab_camera:
@@ -1427,11 +1551,10 @@ def main():
             get_text("camera_help"),
             label_visibility="collapsed",
             help=get_text("camera_help"),
-            key="camera"
+            key=f"camera_{photo_inputs_version}"
         )
         if camera_image:
-            if camera_image not in st.session_state.images:
-                st.session_state.images.append(camera_image)
+            add_image(camera_image)
     
     with tab_upload:
         uploaded_images = st.file_uploader(
@@ -1439,12 +1562,17 @@ def main():
             type=["jpg", "jpeg", "png", "webp"],
             label_visibility="collapsed",
             help="JPG, PNG, WebP",
-            accept_multiple_files=True
+            accept_multiple_files=True,
+            key=f"uploader_{photo_inputs_version}"
         )
         if uploaded_images:
             for img in uploaded_images:
-                if img not in st.session_state.images:
-                    st.session_state.images.append(img)
+                add_image(img)
+    
+    # Warm up the AI connection while the user is still choosing photos
+    if st.session_state.images and not st.session_state.get('connection_warmed'):
+        warm_up_connection(st.session_state['selected_model'])
+        st.session_state['connection_warmed'] = True
     
     # Display collected images as thumbnails
     if st.session_state.images:
@@ -1456,22 +1584,13 @@ def main():
         
         for idx, img in enumerate(st.session_state.images):
             with thumb_cols[idx % 6]:
-                st.image(img, width=70)
-                if st.button("✕", key=f"remove_img_{idx}", help="Remove"):
-                    st.session_state.images.pop(idx)
-                    st.rerun()
+                st.image(make_thumbnail(img), width=70)
+                st.button("✕", key=f"remove_img_{idx}", help="Remove", on_click=remove_image, args=(idx,))
         
         # Action buttons
         col_clear, col_find = st.columns(2)
         with col_clear:
-            if st.button(get_text("clear_photos"), use_container_width=True):
-                st.session_state.images = []
-                st.session_state.pop('detected_ingredients', None)
-                st.session_state.pop('ingredients_list', None)
-                st.session_state.pop('ingredients', None)
-                st.session_state.pop('recipes', None)
-                st.session_state.pop('ingredients_modified', None)
-                st.rerun()
+            st.button(get_text("clear_photos"), use_container_width=True, on_click=clear_search)
         
         with col_find:
             # Only show "Find Recipes" if we don't have recipes yet
@@ -1482,87 +1601,73 @@ def main():
         
         # Combined Step: Detect ingredients AND generate recipes
         if find_clicked:
-            progress_text = st.empty()
+            # One element for the whole flow; its label follows the phase
             progress_bar = st.progress(0)
             
             try:
                 lang = st.session_state.language
                 selected_model = st.session_state.get('selected_model', 'claude')
                 kids_mode = st.session_state.get('kids_mode', False)
-                all_ingredients = []
                 total_images = len(st.session_state.images)
                 
-                # Step 1: Analyze each image (0-50%)
-                for idx, img in enumerate(st.session_state.images):
-                    progress_text.text(f"{get_text('analyzing')} ({idx + 1}/{total_images})")
-                    progress_bar.progress(int((idx + 1) / total_images * 50))
-                    
-                    # Encode image
-                    image_data = encode_image(img)
-                    media_type = get_image_media_type(img)
-                    
-                    # Identify ingredients using selected model
-                    if selected_model == "claude":
-                        ingredients_result = identify_ingredients_claude(anthropic_client, image_data, media_type, lang)
-                    else:
-                        ingredients_result = identify_ingredients_openai(openai_client, image_data, media_type, selected_model, lang)
-                    all_ingredients.append(ingredients_result['raw_response'])
+                # Step 1: Analyze all images in parallel batches (0-50%)
+                progress_bar.progress(10, text=f"{get_text('analyzing')} ({total_images})")
+                
+                all_ingredients = detect_ingredients(
+                    st.session_state.images,
+                    selected_model,
+                    lang,
+                    on_progress=lambda done, total: progress_bar.progress(
+                        10 + 40 * done // total, text=f"{get_text('analyzing')} ({total_images})"
+                    )
+                )
+                progress_bar.progress(50, text=f"{get_text('analyzing')} ({total_images})")
                 
                 # Combine and parse ingredients
                 combined_ingredients = "\n\n".join(all_ingredients)
                 st.session_state['detected_ingredients'] = combined_ingredients
                 st.session_state['ingredients_list'] = parse_ingredients_to_list(combined_ingredients)
+                # The ingredient editor starts over from the new detection
+                st.session_state['ingredients_editor_base'] = list(st.session_state['ingredients_list'])
+                st.session_state['ingredients_editor_version'] = st.session_state.get('ingredients_editor_version', 0) + 1
                 
                 # Step 2: Generate recipes (50-100%)
-                progress_text.text(get_text("finding_recipes"))
-                progress_bar.progress(60)
+                progress_bar.progress(60, text=get_text("finding_recipes"))
+                recipe_preview = st.empty()
                 
                 final_ingredients = "\n".join([f"- {ing}" for ing in st.session_state['ingredients_list']])
                 st.session_state['ingredients'] = final_ingredients
                 
-                # Generate recipes using selected model
-                if selected_model == "claude":
-                    recipes = suggest_recipes_claude(
-                        anthropic_client,
-                        final_ingredients,
-                        dietary_preferences,
-                        cuisine_preference,
-                        lang,
-                        kids_mode
-                    )
-                else:
-                    recipes = suggest_recipes_openai(
-                        openai_client,
-                        selected_model,
-                        final_ingredients,
-                        dietary_preferences,
-                        cuisine_preference,
-                        lang,
-                        kids_mode
+                # Generate recipes using selected model, showing names as they stream in
+                recipes = suggest_recipes(
+                    selected_model,
+                    final_ingredients,
+                    dietary_preferences,
+                    cuisine_preference,
+                    lang,
+                    kids_mode,
+                    on_text=make_recipe_stream_preview(
+                        recipe_preview,
+                        on_progress=lambda fraction: progress_bar.progress(60 + int(30 * fraction), text=get_text("finding_recipes"))
                     )
+                )
                 st.session_state['recipes'] = recipes
                 st.session_state['ingredients_modified'] = False
                 
-                progress_bar.progress(90)
+                progress_bar.progress(90, text=get_text("finding_recipes"))
                 
-                # Save to Supabase if configured
+                # Save to Supabase in the background so the results show immediately
                 if supabase_client:
-                    save_to_supabase(
-                        supabase_client,
-                        final_ingredients,
-                        recipes
-                    )
+                    get_history_writer().queue(supabase_client, final_ingredients, recipes, st.session_state.setdefault('save_errors', []))
+                    st.toast(get_text("saving_history"), icon="💾")
                 
-                progress_bar.progress(100)
-                progress_text.text(get_text("done"))
+                progress_bar.progress(100, text=get_text("done"))
                 time.sleep(0.5)
                 progress_bar.empty()
-                progress_text.empty()
                 st.rerun()
                 
             except Exception as e:
                 progress_bar.empty()
-                progress_text.empty()
                 st.error(f"⚠️ {str(e)}")
                 st.info(get_text("error_tip"))
     
@@ -1575,46 +1680,30 @@ def main():
             with st.expander(get_text("detected_ingredients"), expanded=False):
                 st.caption(get_text("modify_ingredients"))
                 
-                # Display ingredients with delete buttons in 2 columns
-                ingredients_to_remove = []
-                ingredients = st.session_state['ingredients_list']
-                
-                col_left, col_right = st.columns(2)
-                for idx, ingredient in enumerate(ingredients):
-                    with col_left if idx % 2 == 0 else col_right:
-                        col_del, col_ing = st.columns([1, 5])
-                        with col_del:
-                            if st.button("❌", key=f"del_result_{idx}", help=f"Remove {ingredient}"):
-                                ingredients_to_remove.append(idx)
-                        with col_ing:
-                            emoji = get_ingredient_emoji(ingredient)
-                            st.markdown(f"<span style='font-size: 1.1rem;'>{emoji}</span> <span style='font-size: 0.9rem;'>{ingredient}</span>", unsafe_allow_html=True)
-                
-                # Remove ingredients marked for deletion
-                if ingredients_to_remove:
-                    st.session_state['ingredients_list'] = [
-                        ing for idx, ing in enumerate(st.session_state['ingredients_list']) 
-                        if idx not in ingredients_to_remove
-                    ]
-                    st.session_state['ingredients_modified'] = True
-                    st.rerun()
-                
-                # Add new ingredient
-                st.markdown("---")
-                col_input, col_add = st.columns([4, 1])
-                with col_input:
-                    new_ingredient = st.text_input(
-                        get_text("add_ingredient"),
-                        key="new_ingredient_result",
-                        label_visibility="collapsed",
-                        placeholder=get_text("add_ingredient")
+                # One editable table for the whole list; rows can be edited, deleted and added in place.
+                # It always starts from the detected list, since Streamlit re-applies its edits to that input.
+                # Inside a form, all edits are applied with one rerun when the form is submitted.
+                base = st.session_state.get('ingredients_editor_base', st.session_state['ingredients_list'])
+                with st.form("edit_ingredients", border=False):
+                    edited_rows = st.data_editor(
+                        [{"emoji": get_ingredient_emoji(ing), "ingredient": ing} for ing in base],
+                        column_config={
+                            "emoji": st.column_config.TextColumn("", disabled=True, width="small"),
+                            "ingredient": st.column_config.TextColumn(get_text("detected_ingredients")),
+                        },
+                        num_rows="dynamic",
+                        hide_index=True,
+                        use_container_width=True,
+                        key=f"ingredients_editor_{st.session_state.get('ingredients_editor_version', 0)}"
                     )
-                with col_add:
-                    if st.button(get_text("add_button"), key="add_btn_result", use_container_width=True):
-                        if new_ingredient and new_ingredient.strip():
-                            st.session_state['ingredients_list'].append(new_ingredient.strip())
-                            st.session_state['ingredients_modified'] = True
-                            st.rerun()
+                    st.form_submit_button(get_text("apply_changes"), use_container_width=True)
+                edited_ingredients = [
+                    row["ingredient"].strip() for row in edited_rows
+                    if row.get("ingredient") and row["ingredient"].strip()
+                ]
+                if edited_ingredients != st.session_state['ingredients_list']:
+                    st.session_state['ingredients_list'] = edited_ingredients
+                    st.session_state['ingredients_modified'] = True
                 
                 # Regenerate button if ingredients were modified
                 if st.session_state.get('ingredients_modified', False):
@@ -1626,12 +1715,9 @@ def main():
                         st.session_state['ingredients_modified'] = False
                         
                         # Trigger regeneration
-                        progress_text = st.empty()
-                        progress_bar = st.progress(0)
+                        progress_bar = st.progress(30, text=get_text("creating_recipes"))
                         
                         try:
-                            progress_text.text(get_text("creating_recipes"))
-                            progress_bar.progress(30)
                             
                             lang = st.session_state.language
                             selected_model = st.session_state.get('selected_model', 'claude')
@@ -1639,36 +1725,27 @@ def main():
                             
                             final_ingredients = "\n".join([f"- {ing}" for ing in st.session_state['ingredients_list']])
                             st.session_state['ingredients'] = final_ingredients
+                            recipe_preview = st.empty()
                             
-                            if selected_model == "claude":
-                                recipes = suggest_recipes_claude(
-                                    anthropic_client,
-                                    final_ingredients,
-                                    dietary_preferences,
-                                    cuisine_preference,
-                                    lang,
-                                    kids_mode
-                                )
-                            else:
-                                recipes = suggest_recipes_openai(
-                                    openai_client,
-                                    selected_model,
-                                    final_ingredients,
-                                    dietary_preferences,
-                                    cuisine_preference,
-                                    lang,
-                                    kids_mode
+                            recipes = suggest_recipes(
+                                selected_model,
+                                final_ingredients,
+                                dietary_preferences,
+                                cuisine_preference,
+                                lang,
+                                kids_mode,
+                                on_text=make_recipe_stream_preview(
+                                    recipe_preview,
+                                    on_progress=lambda fraction: progress_bar.progress(30 + int(65 * fraction), text=get_text("creating_recipes"))
                                 )
+                            )
                             st.session_state['recipes'] = recipes
                             
-                            progress_bar.progress(100)
-                            progress_text.empty()
                             progress_bar.empty()
                             st.rerun()
                             
                         except Exception as e:
                             progress_bar.empty()
-                            progress_text.empty()
                             st.error(f"⚠️ {str(e)}")
         
         # Recipe suggestions header
@@ -1686,61 +1763,11 @@ def main():
             if 'selected_recipe_idx' not in st.session_state:
                 st.session_state['selected_recipe_idx'] = 0
             
-            # Display recipe cards with emojis and names (as clickable tabs)
             if recipe_list:
-                cols = st.columns(len(recipe_list))
-                for idx, recipe in enumerate(recipe_list):
-                    with cols[idx]:
-                        name = recipe.get("name", f"Recipe {idx + 1}")
-                        emojis = get_recipe_emojis(name)
-                        is_selected = (idx == st.session_state['selected_recipe_idx'])
-                        
-                        # Card as clickable button
-                        if st.button(
-                            f"{emojis}",
-                            key=f"recipe_card_{idx}",
-                            use_container_width=True,
-                            type="primary" if is_selected else "secondary"
-                        ):
-                            st.session_state['selected_recipe_idx'] = idx
-                            st.rerun()
-                        
-                        # Recipe name below button
-                        text_style = "font-weight: 700;" if is_selected else "font-weight: 500;"
-                        st.markdown(f"<p style='text-align: center; font-size: 0.85rem; {text_style} margin-top: -10px;'>{name}</p>", unsafe_allow_html=True)
-                
-                # Custom CSS for recipe cards
-                st.markdown("""
-                <style>
-                    /* Recipe card buttons */
-                    [data-testid="stHorizontalBlock"] [data-testid="stButton"] button {
-                        min-height: 100px !important;
-                        font-size: 2.5rem !important;
-                        border-radius: 15px !important;
-                        background: linear-gradient(135deg, #667eea22, #764ba222) !important;
-                        border: 3px solid transparent !important;
-                        transition: all 0.2s ease !important;
-                    }
-                    [data-testid="stHorizontalBlock"] [data-testid="stButton"] button:hover {
-                        background: linear-gradient(135deg, #667eea33, #764ba233) !important;
-                        transform: translateY(-2px);
-                    }
-                    [data-testid="stHorizontalBlock"] [data-testid="stButton"] button[kind="primary"] {
-                        background: linear-gradient(135deg, #667eea44, #764ba244) !important;
-                        border: 3px solid #667eea !important;
-                    }
-                </style>
-                """, unsafe_allow_html=True)
+                show_recipe_cards(recipe_list, lang)
                 
-                # Show only selected recipe details
-                st.markdown("---")
-                selected_idx = st.session_state['selected_recipe_idx']
-                if selected_idx < len(recipe_list):
-                    selected_recipe = recipe_list[selected_idx]
-                    st.markdown(format_recipe_for_display(selected_recipe, selected_idx + 1, lang))
-                
-                # Prepare download content (all recipes)
-                download_content = "\n\n".join([format_recipe_for_display(r, i, lang) for i, r in enumerate(recipe_list, 1)])
+                # Download content (all recipes), only formatted when the button is clicked
+                download_content = partial(format_recipes_for_download, recipe_list, lang)
         
         elif isinstance(recipes_data, dict) and "raw_text" in recipes_data:
             # Fallback: raw text (JSON parsing failed)
@@ -1764,15 +1791,7 @@ def main():
                 use_container_width=True
             )
         with col_new:
-            if st.button(get_text("new_search"), use_container_width=True):
-                st.session_state.images = []
-                st.session_state.pop('detected_ingredients', None)
-                st.session_state.pop('ingredients_list', None)
-                st.session_state.pop('ingredients', None)
-                st.session_state.pop('recipes', None)
-                st.session_state.pop('selected_recipe_idx', None)
-                st.session_state.pop('ingredients_modified', None)
-                st.rerun()
+            st.button(get_text("new_search"), use_container_width=True, on_click=clear_search)
     
     # Sidebar for model selection and history
     with st.sidebar:
@@ -107,3 +107,20 @@ CREATE POLICY "Allow anonymous inserts" ON recipe_searches
 
 CREATE POLICY "Allow anonymous reads" ON recipe_searches
     FOR SELECT USING (user_id IS NULL);
+
+-- Optional: private bucket for photos sent to the AI by URL instead of inline base64
+-- Set SUPABASE_IMAGE_BUCKET=uploads to enable it
+-- The app deletes each photo as soon as its detection request is done, so photos only stay
+-- in the bucket (and readable through it) for the length of one request
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('uploads', 'uploads', false)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE POLICY "Allow anonymous photo uploads" ON storage.objects
+    FOR INSERT WITH CHECK (bucket_id = 'uploads');
+
+CREATE POLICY "Allow anonymous photo deletes" ON storage.objects
+    FOR DELETE USING (bucket_id = 'uploads');
+
+CREATE POLICY "Allow anonymous photo reads" ON storage.objects
+    FOR SELECT USING (bucket_id = 'uploads');
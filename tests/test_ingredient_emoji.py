@@ -0,0 +1,14 @@
+import pytest
+
+from app import get_ingredient_emoji
+
+
+@pytest.mark.parametrize("ingredient, emoji", [
+    ("cherry tomatoes", "🍅"),
+    ("chicken breast", "🍗"),
+    ("butter lettuce", "🥬"),
+    ("tomatoes", "🍅"),
+    ("olive oil", "🫒"),
+])
+def test_head_noun_wins(ingredient, emoji):
+    assert get_ingredient_emoji(ingredient) == emoji